@@ -1,80 +1,106 @@
+import os
+import threading
+from functools import lru_cache
 import dash
+import flask
 from dash import Dash, dcc, html, Input, Output, State
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
-from data_processing import process_data
-from visualizations import (
-    create_segment_distribution_fig,
-    create_elbow_fig,
-    create_bubble_chart_fig,
-    create_segment_box_plot,
-    create_segment_heatmap,
-    create_segment_comparison_fig,
-    create_segment_scores_fig
+from data_processing import DATA_URL
+import metrics
+from cache import file_lock
+from clustering import DEFAULT_CLUSTERS
+from grid import GRID_BLOCK_SIZE, column_defs
+from lookup import INT64_MAX, INT64_MIN
+from refresh import DEFAULT_POLL_SECONDS, DatasetRefresher
+from visualizations import FIGURE_BUILDERS, build_figure
+from figure_payloads import figure_response, read_payload, serialize_figure, write_payload
+from utils import safe_id, segment_descriptions, customer_segments, chart_info, about_app
+
+# Process the data: score one row per customer and join back to transactions for the grid. Both tables
+# live in the on-disk cache and are memory-mapped, so web workers built from the same source compute
+# them once and share their pages. Everything derived from one version of the data (tables, grid rows,
+# segment counts, figure cache) hangs off refresher.current, which a background refresh replaces whole;
+# each request reads it once so it never sees a half-updated dataset.
+refresher = DatasetRefresher(
+    os.environ.get('RFM_DATA_SOURCE', DATA_URL),
+    interval=float(os.environ.get('RFM_REFRESH_INTERVAL', 0)) or None,
+    poll_interval=float(os.environ.get('RFM_REFRESH_POLL', DEFAULT_POLL_SECONDS)),
+    use_process=os.environ.get('RFM_REFRESH_PROCESS') == '1',
+    clusters=int(os.environ.get('RFM_CLUSTERS', DEFAULT_CLUSTERS)),
 )
-from utils import safe_id, segment_descriptions, chart_info, about_app
-
-# Process the data
-data = process_data()
-data['PurchaseDate'] = data['PurchaseDate'].dt.strftime('%Y-%m-%d')
-
-# Calculate segment counts
-segment_counts = {
-    'Champions': sum(data['RFM Customer Segments'] == 'Champions'),
-    'Potential Loyalists': sum(data['RFM Customer Segments'] == 'Potential Loyalists'),
-    'At Risk Customers': sum(data['RFM Customer Segments'] == 'At Risk Customers'),
-    'Cannot Lose': sum(data['RFM Customer Segments'] == 'Cannot Lose'),
-    'Lost': sum(data['RFM Customer Segments'] == 'Lost')
-}
-
-# Generate figures
-figures = {
-    'segment_distribution': create_segment_distribution_fig(data),
-    'elbow_curve': create_elbow_fig(data),
-    'bubble_chart': create_bubble_chart_fig(data),
-    'champions_distribution': create_segment_box_plot(data, 'Champions'),
-    'correlation_matrix': create_segment_heatmap(data, 'Champions'),
-    'potential_loyalists_distribution': create_segment_box_plot(data, 'Potential Loyalists'),
-    'potential_loyalists_correlation_matrix': create_segment_heatmap(data, 'Potential Loyalists'),
-    'at_risk_customers_distribution': create_segment_box_plot(data, 'At Risk Customers'),
-    'at_risk_customers_correlation_matrix': create_segment_heatmap(data, 'At Risk Customers'),
-    'cannot_lose_distribution': create_segment_box_plot(data, 'Cannot Lose'),
-    'cannot_lose_correlation_matrix': create_segment_heatmap(data, 'Cannot Lose'),
-    'lost_distribution': create_segment_box_plot(data, 'Lost'),
-    'lost_correlation_matrix': create_segment_heatmap(data, 'Lost'),
-    'segment_comparison': create_segment_comparison_fig(data),
-    'segment_scores': create_segment_scores_fig(data),
-}
-
-# Create metric cards
-metric_cards = []
-for segment in ['Champions', 'Potential Loyalists', 'At Risk Customers', 'Cannot Lose', 'Lost']:
-    safe_segment = safe_id(segment)
-    card = dbc.Card(
-        [
-            dbc.CardBody(
-                [
-                    html.H2(str(segment_counts[segment]), className="card-title", style={'fontWeight': 500}),
-                    html.P(segment, className="card-text"),
-                    dbc.Button("?", id=f"{safe_segment}-info", color="link", size="lg", style={'fontWeight':500,'position': 'absolute', 'top': '10px', 'right': '10px'})
-                ],
-                style={'position': 'relative'}
-            )
-        ],
-        style={'border': '4px solid grey'},
-        className="m-2"
-    )
-    popover = dbc.Popover(
-        [
-            dbc.PopoverHeader("Description"),
-            dbc.PopoverBody(segment_descriptions[segment])
-        ],
-        id=f"{safe_segment}-popover",
-        target=f"{safe_segment}-info",
-        placement="top",
-        is_open=False
-    )
-    metric_cards.append(dbc.Col([card, popover], width=2))
+
+# Figures are built and serialized on first use and kept in a bounded LRU cache keyed by chart id and dataset.
+# Serialized figures are also stored next to the cached dataset, so each one is built by a single worker.
+@lru_cache(maxsize=int(os.environ.get('RFM_FIGURE_CACHE_SIZE', 8)))
+def get_figure_payload(chart_id, dataset):
+    payload = read_payload(dataset.figure_dir, chart_id)
+    if payload is not None:
+        return payload
+    with file_lock(os.path.join(dataset.figure_dir, f'{chart_id}.lock')):
+        payload = read_payload(dataset.figure_dir, chart_id)
+        if payload is None:
+            with metrics.timer('rfm_figure_build_seconds', chart=chart_id):
+                payload = serialize_figure(build_figure(chart_id, dataset.customers))
+            write_payload(payload, dataset.figure_dir, chart_id)
+    return payload
+
+def lookup_figure_payload(chart_id):
+    """Return the cached payload for a chart of the current dataset, counting cache hits and misses."""
+    dataset = refresher.current
+    if not metrics.is_enabled():
+        return get_figure_payload(chart_id, dataset)
+    misses = get_figure_payload.cache_info().misses
+    payload = get_figure_payload(chart_id, dataset)
+    result = 'hit' if get_figure_payload.cache_info().misses == misses else 'miss'
+    metrics.inc('rfm_cache_requests_total', cache='figure', result=result)
+    return payload
+
+def prewarm_figures(dataset):
+    """Build every figure of a dataset into the cache in the background."""
+    for chart_id in FIGURE_BUILDERS:
+        get_figure_payload(chart_id, dataset)
+
+@refresher.on_swap
+def release_previous_dataset(dataset):
+    # Drop payloads that pin the old version, then optionally build the new version's figures
+    get_figure_payload.cache_clear()
+    if os.environ.get('RFM_PREWARM_FIGURES') == '1':
+        threading.Thread(target=prewarm_figures, args=(dataset,), daemon=True).start()
+
+_background_started = threading.Event()
+
+def build_metric_cards(segment_counts):
+    """One card per segment with its customer count and a description popover."""
+    metric_cards = []
+    for segment in customer_segments:
+        safe_segment = safe_id(segment)
+        card = dbc.Card(
+            [
+                dbc.CardBody(
+                    [
+                        html.H2(str(segment_counts[segment]), className="card-title", style={'fontWeight': 500}),
+                        html.P(segment, className="card-text"),
+                        dbc.Button("?", id=f"{safe_segment}-info", color="link", size="lg", style={'fontWeight':500,'position': 'absolute', 'top': '10px', 'right': '10px'})
+                    ],
+                    style={'position': 'relative'}
+                )
+            ],
+            style={'border': '4px solid grey'},
+            className="m-2"
+        )
+        popover = dbc.Popover(
+            [
+                dbc.PopoverHeader("Description"),
+                dbc.PopoverBody(segment_descriptions[segment])
+            ],
+            id=f"{safe_segment}-popover",
+            target=f"{safe_segment}-info",
+            placement="top",
+            is_open=False
+        )
+        metric_cards.append(dbc.Col([card, popover], width=2))
+    return metric_cards
 
 # Comment modal
 modal = dbc.Modal(
@@ -99,147 +125,212 @@ modal = dbc.Modal(
 
 # Initialize the app
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+server = app.server
+
+# Background work starts once the server is answering requests, so it runs in each worker process:
+# optionally pre-warm the figure cache, and poll for new data when a refresh interval or poll is configured
+@app.server.before_request
+def start_background_work():
+    if _background_started.is_set():
+        return
+    _background_started.set()
+    if os.environ.get('RFM_PREWARM_FIGURES') == '1':
+        threading.Thread(target=prewarm_figures, args=(refresher.current,), daemon=True).start()
+    if os.environ.get('RFM_REFRESH_INTERVAL') or os.environ.get('RFM_REFRESH_POLL'):
+        refresher.start()
+
+# Prometheus metrics, recorded when RFM_METRICS=1
+@app.server.route('/metrics')
+def metrics_endpoint():
+    return flask.Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Pre-serialized figures with ETags and gzip
+@app.server.route(f'{app.config.routes_pathname_prefix}figures/<chart_id>')
+def figure_endpoint(chart_id):
+    if chart_id not in FIGURE_BUILDERS:
+        flask.abort(404)
+    with metrics.timer('rfm_chart_seconds', chart=chart_id):
+        return figure_response(lookup_figure_payload(chart_id))
+
+# Customer lookups for other systems, served from the current dataset's index
+MAX_LOOKUP_BATCH = int(os.environ.get('RFM_MAX_LOOKUP_BATCH', 50_000))
+
+@app.server.route(f'{app.config.routes_pathname_prefix}customers/<int:customer_id>')
+def customer_endpoint(customer_id):
+    with metrics.timer('rfm_lookup_seconds', kind='single'):
+        record = refresher.current.customer_index.get(customer_id)
+        if record is None:
+            flask.abort(404)
+        return flask.jsonify(record)
+
+@app.server.route(f'{app.config.routes_pathname_prefix}customers/lookup', methods=['POST'])
+def customer_batch_endpoint():
+    ids = (flask.request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(ids, list) or not all(
+        isinstance(value, int) and not isinstance(value, bool) and INT64_MIN <= value <= INT64_MAX for value in ids
+    ):
+        flask.abort(400, description='Expected a JSON body like {"ids": [1001, 1002]} with 64-bit integer ids')
+    if len(ids) > MAX_LOOKUP_BATCH:
+        flask.abort(413, description=f'At most {MAX_LOOKUP_BATCH} ids per request')
+    with metrics.timer('rfm_lookup_seconds', kind='batch'):
+        records, missing = refresher.current.customer_index.records(ids)
+        return flask.jsonify({'customers': records, 'missing': missing})
+
+# App layout, rebuilt on each page load so it shows the current dataset
+def serve_layout():
+    dataset = refresher.current
+    return html.Div([
+        dbc.Row([
+            dbc.Col([
+                dbc.Button("About App", id="popover-bottom-target", color="primary",
+                           style={"color": "white","border": "4px solid grey","marginRight": "10px","fontWeight":500, "padding": "10px 20px"}),
+                dbc.Button("Medium Article", href="https://example.com", external_link=True, target="_blank",
+                           style={"marginRight": "10px","border":"4px solid grey","fontWeight": 500, "padding": "10px 20px"}),
+                dbc.Button("Add Comment", id="open-modal", color="primary",style={"fontWeight": 500,"border":"4px solid grey","padding": "10px 20px"})
+            ], width=3, style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center'}),
 
-# App layout
-app.layout = html.Div([
-    dbc.Row([
-        dbc.Col([
-            dbc.Button("About App", id="popover-bottom-target", color="primary",
-                       style={"color": "white","border": "4px solid grey","marginRight": "10px","fontWeight":500, "padding": "10px 20px"}),
-            dbc.Button("Medium Article", href="https://example.com", external_link=True, target="_blank",
-                       style={"marginRight": "10px","border":"4px solid grey","fontWeight": 500, "padding": "10px 20px"}),
-            dbc.Button("Add Comment", id="open-modal", color="primary",style={"fontWeight": 500,"border":"4px solid grey","padding": "10px 20px"})
-        ], width=3, style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center'}),
-
-        dbc.Col(html.H1("Recency-Frequency-Monetary Value Analysis Dashboard."), width=6, style={'textAlign': 'center'}),
-
-        dbc.Col([
-            html.Img(src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/dsgn1.png",
-                     style={'height': '100px', 'marginRight': '10px'}),
-            html.Img(src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/mypic.jpeg",
-                     style={'height': '100px', 'marginRight': '10px'}),
-            html.A(html.Img(
-                src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/github_logo.png",
-                style={'height': '30px'}),
-                   href="https://github.com/yoadeoye/RFM_Customer_Segmenter",
-                   target="_blank")
-        ], width=3, style={'display': 'flex', 'justifyContent': 'flex-end', 'alignItems': 'center'})
-    ], align='center'),
-
-    dbc.Row([
-        dbc.Col(width=9),
-        dbc.Col(html.H6('yusuf.adeoye@consultant.com', style={'border-top': '1px dash black', 'textAlign': 'right'}),
-                width=3)
-    ]),
-
-    dbc.Popover(
-        [
-            dbc.PopoverHeader("About This App"),
-            dbc.PopoverBody(about_app)
-        ],
-        id="popover",
-        target="popover-bottom-target",
-        placement="bottom",
-        is_open=False
-    ),
-    html.Hr(style={'border-top': '5px solid black'}),
-    html.H3("Analysis of customer purchasing behaviours based on RFM scores.", style={'textAlign': 'center', 'marginBottom': '20px'}, className='card-title'),
-    html.Hr(style={'border-top': '5px solid black'}),
-
-    dbc.Row(metric_cards, justify="center"),
-
-    html.Hr(style={'border-top': '5px solid black'}),
-
-    html.H4('Select the Graph in the dropdown below for the key Insights:'),
-    html.Hr(style={'border': 'none', 'border-top': '5px solid black'}),
-    dcc.Dropdown(
-        id='chart-type-dropdown',
-        options=[
-            {'label': 'RFM Value Segment Distribution', 'value': 'segment_distribution'},
-            {'label': 'Elbow Method for Optimal Clusters', 'value': 'elbow_curve'},
-            {'label': 'RFM Segments by Value (Bubble Chart)', 'value': 'bubble_chart'},
-            {'label': 'Distribution of RFM Scores within Champions Segment', 'value': 'champions_distribution'},
-            {'label': 'Correlation Matrix of RFM Scores within Champions Segment', 'value': 'correlation_matrix'},
-            {'label': 'Distribution of RFM Scores within Potential Loyalists Segment', 'value': 'potential_loyalists_distribution'},
-            {'label': 'Correlation Matrix of RFM Scores within Potential Loyalists Segment', 'value': 'potential_loyalists_correlation_matrix'},
-            {'label': 'Distribution of RFM Scores within At Risk Customers Segment', 'value': 'at_risk_customers_distribution'},
-            {'label': 'Correlation Matrix of RFM Scores within At Risk Customers Segment', 'value': 'at_risk_customers_correlation_matrix'},
-            {'label': 'Distribution of RFM Scores within Cannot Lose Segment', 'value': 'cannot_lose_distribution'},
-            {'label': 'Correlation Matrix of RFM Scores within Cannot Lose Segment', 'value': 'cannot_lose_correlation_matrix'},
-            {'label': 'Distribution of RFM Scores within Lost Segment', 'value': 'lost_distribution'},
-            {'label': 'Correlation Matrix of RFM Scores within Lost Segment', 'value': 'lost_correlation_matrix'},
-            {'label': 'Comparison of RFM by clusters/business needs', 'value': 'segment_comparison'},
-            {'label': 'Comparison of RFM Segments based on Scores', 'value': 'segment_scores'},
-        ],
-        value='segment_distribution',
-        style={'marginBottom': '20px'}
-    ),
-    html.Hr(style={'border-top': '10px solid black'}),
-
-    dbc.Row([
-        dbc.Col(
-            dbc.Card([
-                dbc.CardHeader([
-                    html.H4(id='graph-title'),
-                    dbc.Button(
-                        "?",
-                        id="help-button",
-                        color="link",
-                        size="lg",
-                        style={'border':'2px solid grey','borderRadius': '60%','fontWeight':500,'backgroundColor': 'darkgrey','position': 'absolute', 'top': '10px', 'right': '10px'}
-                    )
+            dbc.Col(html.H1("Recency-Frequency-Monetary Value Analysis Dashboard."), width=6, style={'textAlign': 'center'}),
+
+            dbc.Col([
+                html.Img(src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/dsgn1.png",
+                         style={'height': '100px', 'marginRight': '10px'}),
+                html.Img(src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/mypic.jpeg",
+                         style={'height': '100px', 'marginRight': '10px'}),
+                html.A(html.Img(
+                    src="https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/main/img/github_logo.png",
+                    style={'height': '30px'}),
+                       href="https://github.com/yoadeoye/RFM_Customer_Segmenter",
+                       target="_blank")
+            ], width=3, style={'display': 'flex', 'justifyContent': 'flex-end', 'alignItems': 'center'})
+        ], align='center'),
+
+        dbc.Row([
+            dbc.Col(width=9),
+            dbc.Col(html.H6('yusuf.adeoye@consultant.com', style={'border-top': '1px dash black', 'textAlign': 'right'}),
+                    width=3)
+        ]),
+
+        dbc.Popover(
+            [
+                dbc.PopoverHeader("About This App"),
+                dbc.PopoverBody(about_app)
+            ],
+            id="popover",
+            target="popover-bottom-target",
+            placement="bottom",
+            is_open=False
+        ),
+        html.Hr(style={'border-top': '5px solid black'}),
+        html.H3("Analysis of customer purchasing behaviours based on RFM scores.", style={'textAlign': 'center', 'marginBottom': '20px'}, className='card-title'),
+        html.Hr(style={'border-top': '5px solid black'}),
+
+        dbc.Row(build_metric_cards(dataset.segment_counts), justify="center"),
+
+        html.Hr(style={'border-top': '5px solid black'}),
+
+        html.H4('Select the Graph in the dropdown below for the key Insights:'),
+        html.Hr(style={'border': 'none', 'border-top': '5px solid black'}),
+        dcc.Dropdown(
+            id='chart-type-dropdown',
+            options=[{'label': info['title'], 'value': chart_id} for chart_id, info in chart_info.items()],
+            value='segment_distribution',
+            style={'marginBottom': '20px'}
+        ),
+        html.Hr(style={'border-top': '10px solid black'}),
+
+        dbc.Row([
+            dbc.Col(
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.H4(id='graph-title'),
+                        dbc.Button(
+                            "?",
+                            id="help-button",
+                            color="link",
+                            size="lg",
+                            style={'border':'2px solid grey','borderRadius': '60%','fontWeight':500,'backgroundColor': 'darkgrey','position': 'absolute', 'top': '10px', 'right': '10px'}
+                        )
+                    ]),
+                    dbc.CardBody(dcc.Graph(id='rfm-chart'))
                 ]),
-                dbc.CardBody(dcc.Graph(id='rfm-chart'))
-            ]),
-            width=10
-        )
-    ]),
-    html.Hr(style={'border-top': '10px solid black'}),
-
-    dag.AgGrid(
-        id="grid",
-        rowData=data.to_dict("records"),
-        columnDefs=[{"field": i} for i in data.columns],
-        defaultColDef={"filter": True},
-        dashGridOptions={"pagination": True, "animateRows": False}
-    ),
-    modal,
-
-    dbc.Modal(
-        [
-            dbc.ModalHeader(id='modal-header'),
-            dbc.ModalBody(html.Div(id='modal-description')),
-            dbc.ModalFooter(
-                dbc.Button("Close", id="close-graph-modal", className="ml-auto")
+                width=10
             )
-        ],
-        id="graph-modal",
-        is_open=False,
-        size="m",
-        backdrop=True,
-        scrollable=True,
-        centered=True,
-        fade=True
-    )
-])
+        ]),
+        html.Hr(style={'border-top': '10px solid black'}),
+
+        dag.AgGrid(
+            id="grid",
+            rowModelType="infinite",
+            columnDefs=column_defs(dataset.data),
+            defaultColDef={"filter": True, "sortable": True},
+            dashGridOptions={
+                "pagination": True,
+                "paginationPageSize": GRID_BLOCK_SIZE,
+                "cacheBlockSize": GRID_BLOCK_SIZE,
+                "maxBlocksInCache": 10,
+                "animateRows": False
+            }
+        ),
+        modal,
+
+        dbc.Modal(
+            [
+                dbc.ModalHeader(id='modal-header'),
+                dbc.ModalBody(html.Div(id='modal-description')),
+                dbc.ModalFooter(
+                    dbc.Button("Close", id="close-graph-modal", className="ml-auto")
+                )
+            ],
+            id="graph-modal",
+            is_open=False,
+            size="m",
+            backdrop=True,
+            scrollable=True,
+            centered=True,
+            fade=True
+        )
+    ])
+
+app.layout = serve_layout
+
+# The chart is fetched by the browser from the figure route, so repeat views are answered with 304s
+app.clientside_callback(
+    """
+    async function(chartId) {
+        const response = await fetch('%s' + encodeURIComponent(chartId));
+        return await response.json();
+    }
+    """ % app.get_relative_path('/figures/'),
+    Output('rfm-chart', 'figure'),
+    Input('chart-type-dropdown', 'value')
+)
 
 @app.callback(
     [
-        Output('rfm-chart', 'figure'),
         Output('graph-title', 'children'),
         Output('modal-header', 'children'),
         Output('modal-description', 'children')
     ],
     [Input('chart-type-dropdown', 'value')]
 )
+@metrics.timed('rfm_callback_seconds', callback='update_chart_and_info')
 def update_chart_and_info(selected_chart_type):
     info = chart_info[selected_chart_type]
     title = info['title']
     short_title = info['short_title']
     description = info['description']
-    fig = figures[selected_chart_type]
     modal_header = f"{short_title}"
-    return fig, title, modal_header, description
+    return title, modal_header, description
+
+@app.callback(
+    Output("grid", "getRowsResponse"),
+    Input("grid", "getRowsRequest")
+)
+@metrics.timed('rfm_callback_seconds', callback='serve_grid_rows')
+def serve_grid_rows(request):
+    if request is None:
+        return dash.no_update
+    return refresher.current.grid_source.get_rows(request)
 
 @app.callback(
     Output("graph-modal", "is_open"),
@@ -249,6 +340,7 @@ def update_chart_and_info(selected_chart_type):
     ],
     [State("graph-modal", "is_open")]
 )
+@metrics.timed('rfm_callback_seconds', callback='toggle_graph_modal')
 def toggle_graph_modal(n_help, n_close, is_open):
     ctx = dash.callback_context
     if not ctx.triggered:
@@ -265,6 +357,7 @@ def toggle_graph_modal(n_help, n_close, is_open):
     [Input("popover-bottom-target", "n_clicks")],
     [State("popover", "is_open")]
 )
+@metrics.timed('rfm_callback_seconds', callback='toggle_popover')
 def toggle_popover(n, is_open):
     if n:
         return not is_open
@@ -275,18 +368,20 @@ def toggle_popover(n, is_open):
     [Input("open-modal", "n_clicks"), Input("close-modal", "n_clicks")],
     [State("modal", "is_open")]
 )
+@metrics.timed('rfm_callback_seconds', callback='toggle_modal')
 def toggle_modal(n1, n2, is_open):
     if n1 or n2:
         return not is_open
     return is_open
 
-for segment in ['Champions', 'Potential Loyalists', 'At Risk Customers', 'Cannot Lose', 'Lost']:
+for segment in customer_segments:
     safe_segment = safe_id(segment)
     @app.callback(
         Output(f"{safe_segment}-popover", "is_open"),
         [Input(f"{safe_segment}-info", "n_clicks")],
         [State(f"{safe_segment}-popover", "is_open")]
     )
+    @metrics.timed('rfm_callback_seconds', callback='toggle_segment_popover')
     def toggle_segment_popover(n, is_open, segment=segment):
         if n:
             return not is_open
@@ -0,0 +1,107 @@
+"""Headless batch scoring: per-customer RFM scores written as Parquet partitioned by segment.
+
+Usage:
+    python batch_score.py transactions.csv --output scores/
+    python batch_score.py daily_exports/ --output scores/ --as-of 2024-01-01 --timings
+    python batch_score.py transactions.csv --output scores/ --binning quantile --save-edges edges.json
+    python batch_score.py new.csv --output scores/ --edges edges.json
+
+A directory input is treated as one transaction history split across its CSV
+files. Only pandas and NumPy are imported; the Dash app, Plotly and
+scikit-learn are never loaded.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+
+SEGMENT_COLUMN = 'RFM Customer Segments'
+
+def input_files(paths):
+    """Expand directories to the CSV files they contain, in name order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, '*.csv')))
+            if not found:
+                raise FileNotFoundError(f"No CSV files in {path}")
+            files.extend(found)
+        else:
+            files.append(path)
+    return files
+
+def score_files(files, as_of=None, chunksize=None, max_memory_mb=None, edges=None, binning='equal_width'):
+    """Aggregate every file to per-customer partials, merge them and score the result.
+
+    Returns the scored table and the score bin edges it was scored with.
+    """
+    from data_processing import (
+        DEFAULT_CHUNKSIZE,
+        aggregate_customers_chunked,
+        calculate_customer_recency,
+        merge_customer_partials,
+        rfm_score_edges,
+        score_customers,
+    )
+
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    partials = [aggregate_customers_chunked(path, chunksize, max_memory_mb) for path in files]
+    customers = partials[0] if len(partials) == 1 else merge_customer_partials(partials)
+    if edges is None:
+        edges = rfm_score_edges(calculate_customer_recency(customers, as_of), binning)
+    return score_customers(customers, as_of, edges), edges
+
+def write_partitioned(customers, output):
+    """Write one Parquet directory per segment, replacing ``output`` only once the write has finished."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("Writing Parquet output requires pyarrow: pip install pyarrow") from exc
+    output = output.rstrip(os.sep)
+    tmp_output = f'{output}.tmp'
+    shutil.rmtree(tmp_output, ignore_errors=True)
+    customers.to_parquet(tmp_output, partition_cols=[SEGMENT_COLUMN], index=False)
+    shutil.rmtree(output, ignore_errors=True)
+    os.replace(tmp_output, output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='transaction CSV files or directories of CSV files')
+    parser.add_argument('--output', required=True, help='directory to write the partitioned Parquet dataset to')
+    parser.add_argument('--as-of', help='date Recency is measured from (default: now)')
+    parser.add_argument('--chunksize', type=int, help='rows read per CSV chunk')
+    parser.add_argument('--max-memory-mb', type=int, help='ceiling for the in-memory per-customer partials')
+    parser.add_argument('--binning', choices=['equal_width', 'quantile'], default='equal_width', help='how score bins are derived')
+    parser.add_argument('--edges', help='score against bin edges frozen in this JSON file instead of deriving them')
+    parser.add_argument('--save-edges', help='write the bin edges used to this JSON file')
+    parser.add_argument('--timings', action='store_true', help='print the time spent in each phase to stderr')
+    args = parser.parse_args(argv)
+
+    # pandas is imported only once the arguments are valid, so --help and usage errors stay instant
+    start = time.perf_counter()
+    files = input_files(args.inputs)
+    import pandas as pd
+    from binning import load_edges, save_edges
+    imported = time.perf_counter()
+    edges = load_edges(args.edges) if args.edges else None
+    customers, edges = score_files(files, args.as_of, args.chunksize, args.max_memory_mb, edges, args.binning)
+    if args.save_edges:
+        save_edges(edges, args.save_edges)
+    scored = time.perf_counter()
+    write_partitioned(customers, args.output)
+    written = time.perf_counter()
+
+    counts = customers[SEGMENT_COLUMN].value_counts(sort=False)
+    print(pd.DataFrame({'customers': counts}).to_string())
+    if args.timings:
+        print(
+            f"files {len(files)}  import {imported - start:.3f}s  score {scored - imported:.3f}s  "
+            f"write {written - scored:.3f}s  total {written - start:.3f}s",
+            file=sys.stderr,
+        )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
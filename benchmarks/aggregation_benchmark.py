@@ -0,0 +1,51 @@
+"""Compare the merge-based RFM pipeline with the single-pass customer aggregation.
+
+Usage: python benchmarks/aggregation_benchmark.py [rows] [customers]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_processing import (
+    calculate_recency,
+    calculate_frequency,
+    calculate_monetary,
+    assign_rfm_scores,
+    assign_rfm_value_segments,
+    assign_rfm_customer_segments,
+    process_data,
+)
+from synthetic import generate_transactions
+
+def merge_pipeline(data):
+    """The original per-transaction pipeline with two groupby/merge round trips."""
+    data = calculate_recency(data)
+    data = calculate_frequency(data)
+    data = calculate_monetary(data)
+    data = assign_rfm_scores(data)
+    data = assign_rfm_value_segments(data)
+    return assign_rfm_customer_segments(data)
+
+def measure(label, func, data):
+    """Run func on a copy of data and print wall time and peak traced memory."""
+    data = data.copy()
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>8.3f} s {peak / 2**20:>10.1f} MiB peak")
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    transactions = generate_transactions(rows, n_customers)
+    print(f"{rows:,} transactions, {n_customers:,} customers")
+    measure('merge pipeline', merge_pipeline, transactions)
+    measure('customer aggregation', process_data, transactions)
+    measure('aggregation + join back', lambda d: process_data(d, join_transactions=True), transactions)
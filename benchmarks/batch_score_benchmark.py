@@ -0,0 +1,51 @@
+"""Measure interpreter startup and end-to-end runtime of the batch scoring CLI.
+
+Startup is compared with importing what ``app.py`` imports; runtime is measured
+per dataset size, each in a fresh interpreter as a nightly job would run it.
+
+Usage: python benchmarks/batch_score_benchmark.py [rows,rows,...] [repeats]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_transactions_csv
+
+APP_IMPORTS = 'import dash, dash_ag_grid, dash_bootstrap_components, plotly.express, sklearn.cluster, data_processing'
+
+def wall_time(command, repeats):
+    """Best wall time of ``command`` over ``repeats`` fresh processes."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == '__main__':
+    sizes = [int(value) for value in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100_000, 1_000_000]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    python = sys.executable
+
+    print('startup')
+    for label, command in [
+        ('interpreter', [python, '-c', 'pass']),
+        ('batch_score --help', [python, 'batch_score.py', '--help']),
+        ('import data_processing', [python, '-c', 'import data_processing']),
+        ('import app dependencies', [python, '-c', APP_IMPORTS]),
+    ]:
+        print(f"  {label:<24} {wall_time(command, repeats):>8.3f} s")
+
+    print('scoring')
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            source = write_transactions_csv(os.path.join(workdir, f'transactions-{rows}.csv'), rows, max(rows // 20, 1))
+            output = os.path.join(workdir, 'scores')
+            seconds = wall_time([python, 'batch_score.py', source, '--output', output, '--as-of', '2024-01-01'], repeats)
+            print(f"  {rows:>12,} rows {seconds:>8.3f} s")
@@ -0,0 +1,55 @@
+"""Accuracy, memory and speed of the KLL quantile sketch against exact quantiles.
+
+For each sketch size ``k`` the sketch is filled chunk by chunk (streaming) and
+from separate partitions that are merged, and its quintile edges are compared
+with the exact ones by rank error.
+
+Usage: python benchmarks/binning_benchmark.py [values] [partitions]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binning import KLLSketch
+
+QUINTILES = np.linspace(0, 1, 6)
+
+def rank_error(sorted_values, estimates):
+    """Largest gap between requested and achieved ranks, as a fraction of the count."""
+    ranks = np.searchsorted(sorted_values, estimates, side='left') / len(sorted_values)
+    return np.abs(ranks - QUINTILES).max()
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    partitions = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    # Skewed like customer spend
+    values = np.random.default_rng(0).lognormal(4, 1.3, n)
+
+    start = time.perf_counter()
+    exact_sorted = np.sort(values)
+    np.quantile(exact_sorted, QUINTILES)
+    print(f"{n:,} values, exact quantiles in {time.perf_counter() - start:.3f} s, {values.nbytes / 2**20:.1f} MiB")
+
+    for k in (50, 100, 200, 400):
+        start = time.perf_counter()
+        streamed = KLLSketch(k, seed=0)
+        for chunk in np.array_split(values, 100):
+            streamed.update(chunk)
+        stream_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parts = [KLLSketch(k, seed=index).update(part) for index, part in enumerate(np.array_split(values, partitions))]
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        merge_seconds = time.perf_counter() - start
+
+        print(
+            f"k={k:<4} stream {stream_seconds:>6.3f} s  rank error {rank_error(exact_sorted, streamed.quantiles(QUINTILES)):.4f}"
+            f"  retained {streamed.retained():>5}   merged {merge_seconds:>6.3f} s"
+            f"  rank error {rank_error(exact_sorted, merged.quantiles(QUINTILES)):.4f}  retained {merged.retained():>5}"
+        )
@@ -0,0 +1,27 @@
+"""Compare a cold start (parse and score) with a warm start from the columnar cache.
+
+Usage: python benchmarks/cache_benchmark.py [rows] [customers]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_transactions
+from cache import load_scored_data
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'transactions.csv')
+        generate_transactions(rows, n_customers).to_csv(source, index=False)
+        cache_dir = os.path.join(workdir, 'cache')
+        print(f"{rows:,} transactions, {n_customers:,} customers")
+        for label in ('cold start', 'warm start'):
+            start = time.perf_counter()
+            load_scored_data(source, cache_dir)
+            print(f"{label:<12} {time.perf_counter() - start:>8.3f} s")
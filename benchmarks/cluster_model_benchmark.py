@@ -0,0 +1,45 @@
+"""Time fitting the persisted KMeans model and assigning customers to it, by dataset size.
+
+For each customer count: fit time (KMeans and MiniBatchKMeans), which is what
+every refresh would cost without a persisted model, nearest-centroid assignment
+throughput, and the model's size on disk.
+
+Usage: python benchmarks/cluster_model_benchmark.py [customer_counts] [k]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clustering import DEFAULT_CLUSTERS, ClusterModel
+from data_processing import process_data
+from synthetic import generate_transactions
+
+if __name__ == '__main__':
+    counts = [int(count) for count in (sys.argv[1] if len(sys.argv) > 1 else '10000,100000,500000').split(',')]
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CLUSTERS
+    path = os.path.join(tempfile.mkdtemp(), 'clusters.npz')
+    import sklearn.cluster  # noqa: F401  (keep the import out of the first fit time)
+    print(f"{'customers':>10} {'fit':>9} {'fit mini':>9} {'assign':>9} {'rows/s':>12} {'on disk':>9}")
+    for n_customers in counts:
+        customers = process_data(generate_transactions(n_customers * 5, n_customers))
+
+        start = time.perf_counter()
+        model = ClusterModel.fit(customers, k)
+        fit = time.perf_counter() - start
+        start = time.perf_counter()
+        ClusterModel.fit(customers, k, mini_batch=True)
+        fit_mini = time.perf_counter() - start
+
+        model.save(path)
+        model = ClusterModel.load(path)
+        start = time.perf_counter()
+        model.assign(customers)
+        assign = time.perf_counter() - start
+        print(
+            f"{len(customers):>10,} {fit:>8.3f}s {fit_mini:>8.3f}s {assign:>8.4f}s "
+            f"{len(customers) / assign:>12,.0f} {os.path.getsize(path):>8,}B"
+        )
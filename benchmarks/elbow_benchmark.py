@@ -0,0 +1,41 @@
+"""Time the elbow-curve modes and report their error against the exact curve.
+
+Usage: python benchmarks/elbow_benchmark.py [rows] [customers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_transactions
+from clustering import _elbow_cache, elbow_approximation_error, elbow_inertia
+from data_processing import process_data
+
+MODES = {
+    'exact, parallel': dict(n_jobs=-1),
+    'sample 50k': dict(sample_size=50_000, n_jobs=-1),
+    'mini-batch': dict(mini_batch=True, n_jobs=-1),
+    'sample 50k + mini-batch': dict(sample_size=50_000, mini_batch=True, n_jobs=-1),
+}
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    customers = process_data(generate_transactions(rows, n_customers))
+    print(f"{rows:,} transactions, {len(customers):,} customers")
+    start = time.perf_counter()
+    elbow_inertia(customers)
+    print(f"{'exact, serial':<26} {time.perf_counter() - start:>8.3f} s")
+    for label, options in MODES.items():
+        _elbow_cache.clear()
+        start = time.perf_counter()
+        elbow_inertia(customers, **options)
+        elapsed = time.perf_counter() - start
+        report = elbow_approximation_error(customers, **options)
+        worst = report['relative_error'].abs().max()
+        print(f"{label:<26} {elapsed:>8.3f} s   max relative error {worst:.2%}")
+    start = time.perf_counter()
+    elbow_inertia(customers, sample_size=50_000, mini_batch=True)
+    print(f"{'cached repeat':<26} {time.perf_counter() - start:>8.3f} s")
@@ -0,0 +1,111 @@
+"""Load test: many users switching charts, before and after pre-serialized figure responses.
+
+"Before" is a Dash callback that returns the figure object, which Dash
+re-serializes on every request. "After" is the app's /figures/<chart_id> route,
+with each simulated user revalidating the ETag it last saw, like a browser does.
+
+Usage: python benchmarks/figure_load_test.py [users] [switches_per_user] [rows]
+"""
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_transactions_csv
+
+def serve(flask_app):
+    """Run a Flask app on a free local port in a background thread."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def callback_body(chart_id):
+    """Request body of a Dash update for the old figure-returning callback."""
+    return json.dumps({
+        'output': 'rfm-chart.figure',
+        'outputs': {'id': 'rfm-chart', 'property': 'figure'},
+        'inputs': [{'id': 'chart-type-dropdown', 'property': 'value', 'value': chart_id}],
+        'changedPropIds': ['chart-type-dropdown.value'],
+    })
+
+def run_users(port, users, switches, chart_ids, request_once):
+    """Let each user switch charts at random and return all request latencies."""
+    def user(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        etags = {}
+        latencies = []
+        for _ in range(switches):
+            chart_id = rng.choice(chart_ids)
+            start = time.perf_counter()
+            request_once(connection, chart_id, etags)
+            latencies.append(time.perf_counter() - start)
+        connection.close()
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        return [latency for result in pool.map(user, range(users)) for latency in result]
+
+def old_request(connection, chart_id, etags):
+    connection.request('POST', '/_dash-update-component', callback_body(chart_id), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 200, response.status
+
+def new_request(connection, chart_id, etags):
+    headers = {'Accept-Encoding': 'gzip'}
+    if chart_id in etags:
+        headers['If-None-Match'] = etags[chart_id]
+    connection.request('GET', f'/figures/{chart_id}', headers=headers)
+    response = connection.getresponse()
+    response.read()
+    etags[chart_id] = response.getheader('ETag')
+
+def report(label, latencies):
+    latencies = np.array(latencies) * 1000
+    print(f"{label:<8} p50 {np.percentile(latencies, 50):>8.2f} ms   p99 {np.percentile(latencies, 99):>8.2f} ms   n={len(latencies)}")
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    switches = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 100_000
+    workdir = tempfile.mkdtemp()
+    os.environ['RFM_DATA_SOURCE'] = write_transactions_csv(os.path.join(workdir, 'transactions.csv'), rows, max(rows // 20, 1))
+    os.environ['RFM_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.environ['RFM_FIGURE_CACHE_SIZE'] = '32'
+
+    import app
+    from dash import Dash, Input, Output, dcc, html
+
+    chart_ids = list(app.FIGURE_BUILDERS)
+    dataset = app.refresher.current
+    figures = {chart_id: app.build_figure(chart_id, dataset.customers) for chart_id in chart_ids}
+    before = Dash(__name__)
+    before.layout = html.Div([dcc.Dropdown(id='chart-type-dropdown'), dcc.Graph(id='rfm-chart')])
+
+    @before.callback(Output('rfm-chart', 'figure'), Input('chart-type-dropdown', 'value'))
+    def update_chart(chart_id):
+        return figures[chart_id]
+
+    app.prewarm_figures(dataset)
+
+    for label, flask_app, request_once in [('before', before.server, old_request), ('after', app.app.server, new_request)]:
+        server = serve(flask_app)
+        report(label, run_users(server.server_port, users, switches, chart_ids, request_once))
+        server.shutdown()
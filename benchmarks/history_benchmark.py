@@ -0,0 +1,36 @@
+"""Compare ``rfm_history`` with re-running ``process_data`` once per as-of date.
+
+Usage: python benchmarks/history_benchmark.py [rows] [customers] [snapshots]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_processing import process_data
+from history import rfm_history, segment_transitions
+from synthetic import generate_transactions
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    snapshots = int(sys.argv[3]) if len(sys.argv) > 3 else 24
+    data = generate_transactions(rows, n_customers, days=snapshots * 31)
+    as_of_dates = pd.date_range(data['PurchaseDate'].min(), periods=snapshots, freq='ME')
+    print(f"{rows:,} transactions, {n_customers:,} customers, {snapshots} month-ends")
+
+    start = time.perf_counter()
+    history = rfm_history(data, as_of_dates)
+    transitions = segment_transitions(history)
+    vectorized = time.perf_counter() - start
+    print(f"rfm_history          {vectorized:>8.3f} s   {len(history):,} rows, {len(transitions):,} transitions")
+
+    start = time.perf_counter()
+    for as_of in as_of_dates:
+        process_data(data[data['PurchaseDate'] <= as_of], as_of=as_of)
+    looped = time.perf_counter() - start
+    print(f"process_data per date {looped:>8.3f} s   ({looped / vectorized:.1f}x)")
@@ -0,0 +1,54 @@
+"""Time RFMState.update for a batch of new transactions against a large history.
+
+The history is generated and aggregated in chunks, so the default 50M-row
+history fits in a few GB. Only the per-customer state is kept.
+
+Usage: python benchmarks/incremental_benchmark.py [history_rows] [customers] [batch_rows]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import customer_weights, generate_transactions
+from data_processing import aggregate_customers, merge_customer_partials, score_customers
+from incremental import RFMState
+
+CHUNK_ROWS = 5_000_000
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000_000
+    batch_rows = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+    as_of = pd.Timestamp('2024-01-01')
+    weights = customer_weights(n_customers)
+    start = time.perf_counter()
+    partials = []
+    for offset in range(0, rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - offset)
+        chunk = generate_transactions(size, n_customers, seed=offset, first_order_id=100000 + offset, weights=weights)
+        partials.append(aggregate_customers(chunk))
+        del chunk
+        partials = [merge_customer_partials(partials)]
+    customers = score_customers(partials[0], as_of)
+    state = RFMState(customers.set_index('CustomerID'), as_of)
+    del partials, customers
+    print(f"full build of {rows:,} rows, {len(state.customers):,} customers: {time.perf_counter() - start:.3f} s")
+
+    batch = generate_transactions(batch_rows, n_customers + n_customers // 100, seed=1, first_order_id=10**10)
+    # With frozen edges only the batch's customers are rescored; otherwise a moved edge rescores everyone
+    frozen = RFMState(state.customers, as_of, frozen_edges=state.score_edges)
+    start = time.perf_counter()
+    frozen.update(batch, as_of)
+    print(f"update with {batch_rows:,} rows, same as-of date, frozen edges: {time.perf_counter() - start:.3f} s")
+    del frozen
+    start = time.perf_counter()
+    state.update(batch, as_of)
+    print(f"update with {batch_rows:,} rows, same as-of date: {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    state.update(batch, as_of + pd.Timedelta(days=1))
+    print(f"update with {batch_rows:,} rows, next day: {time.perf_counter() - start:.3f} s")
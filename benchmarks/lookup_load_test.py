@@ -0,0 +1,95 @@
+"""Load test for the customer lookup API, against scanning the customer table per request.
+
+Prints in-process latency of one lookup through ``CustomerIndex`` and through
+a boolean-mask scan, the time to look up a large batch, and the latency seen
+by concurrent HTTP clients of ``/customers/<id>`` and ``/customers/lookup``.
+
+Usage: python benchmarks/lookup_load_test.py [users] [requests_per_user] [rows] [batch_size]
+"""
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from figure_load_test import report, serve
+from synthetic import write_transactions_csv
+
+def time_each(function, ids):
+    latencies = []
+    for customer_id in ids:
+        start = time.perf_counter()
+        function(customer_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_clients(port, users, requests, request_once):
+    """Let each client send ``requests`` requests and return all latencies."""
+    def client(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_once(connection, rng)
+            latencies.append(time.perf_counter() - start)
+        connection.close()
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        return [latency for result in pool.map(client, range(users)) for latency in result]
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rows = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000_000
+    batch_size = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    workdir = tempfile.mkdtemp()
+    os.environ['RFM_DATA_SOURCE'] = write_transactions_csv(os.path.join(workdir, 'transactions.csv'), rows, max(rows // 20, 1))
+    os.environ['RFM_CACHE_DIR'] = os.path.join(workdir, 'cache')
+
+    import app
+
+    dataset = app.refresher.current
+    customers = dataset.customers
+    all_ids = customers['CustomerID'].to_numpy()
+    print(f"{rows:,} transactions, {len(customers):,} customers")
+
+    start = time.perf_counter()
+    index = type(dataset.customer_index)(customers)
+    print(f"index build {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+    sample = np.random.default_rng(0).choice(all_ids, 1000).tolist()
+    report('scan', time_each(lambda customer_id: customers[customers['CustomerID'] == customer_id].to_dict('records'), sample))
+    report('index', time_each(index.get, sample))
+
+    batch = np.random.default_rng(1).choice(all_ids, batch_size * 10).tolist()
+    start = time.perf_counter()
+    index.records(batch)
+    print(f"batch of {len(batch):,} ids {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+    def single_request(connection, rng):
+        connection.request('GET', f'/customers/{rng.choice(sample)}')
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+
+    def batch_request(connection, rng):
+        body = json.dumps({'ids': rng.sample(sample, min(batch_size, len(sample)))})
+        connection.request('POST', '/customers/lookup', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+
+    server = serve(app.app.server)
+    report('single', run_clients(server.server_port, users, requests, single_request))
+    report('batch', run_clients(server.server_port, users, max(requests // 10, 1), batch_request))
+    server.shutdown()
@@ -0,0 +1,36 @@
+"""Measure how the partitioned pipeline scales from 1 to N worker processes.
+
+Usage: python benchmarks/parallel_benchmark.py [rows] [customers] [max_workers]
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_transactions
+from data_processing import process_data, process_data_parallel
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    n_customers = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    as_of = pd.Timestamp('2024-01-01')
+    transactions = generate_transactions(rows, n_customers)
+    print(f"{rows:,} transactions, {n_customers:,} customers")
+
+    start = time.perf_counter()
+    expected = process_data(transactions, as_of=as_of)
+    serial = time.perf_counter() - start
+    print(f"{'serial':<12} {serial:>8.3f} s")
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        result = process_data_parallel(transactions, workers, as_of)
+        elapsed = time.perf_counter() - start
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{workers:>3} workers  {elapsed:>8.3f} s  speedup {serial / elapsed:.2f}x")
+        workers *= 2
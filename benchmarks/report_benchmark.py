@@ -0,0 +1,34 @@
+"""Time the offline report cold with different worker counts, then warm on unchanged data.
+
+Usage: python benchmarks/report_benchmark.py [rows] [worker_counts]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import load_scored_entry
+from report import render_report
+from synthetic import write_transactions_csv
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    worker_counts = [int(count) for count in (sys.argv[2] if len(sys.argv) > 2 else f'1,{os.cpu_count()}').split(',')]
+    workdir = tempfile.mkdtemp()
+    source = write_transactions_csv(os.path.join(workdir, 'transactions.csv'), rows, max(rows // 20, 1))
+    cache_dir = os.path.join(workdir, 'cache')
+    output = os.path.join(workdir, 'report')
+    load_scored_entry(source, cache_dir)
+    print(f"{rows:,} transactions, {os.cpu_count()} CPUs")
+
+    for workers in worker_counts:
+        start = time.perf_counter()
+        rendered = render_report(source, output, cache_dir, workers, formats=['html'], force=True)
+        print(f"cold, {workers:>2} workers {time.perf_counter() - start:>8.3f} s   {len(rendered)} charts")
+
+    start = time.perf_counter()
+    rendered = render_report(source, output, cache_dir, formats=['html'])
+    print(f"warm, unchanged   {time.perf_counter() - start:>8.3f} s   {len(rendered)} charts")
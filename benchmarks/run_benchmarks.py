@@ -0,0 +1,131 @@
+"""Time and memory-profile every pipeline stage and figure builder at several scales.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 1000,100000,1000000 --output results.json
+    python benchmarks/run_benchmarks.py --rows 100000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_processing import (
+    aggregate_customers,
+    assign_rfm_customer_segments,
+    assign_rfm_scores,
+    assign_rfm_value_segments,
+    calculate_customer_recency,
+    calculate_frequency,
+    calculate_monetary,
+    calculate_recency,
+    load_data,
+)
+from synthetic import write_transactions_csv
+from visualizations import FIGURE_BUILDERS
+
+AS_OF = pd.Timestamp('2024-01-01')
+
+def measure(stage, func, *args):
+    """Run one stage and return its result with wall time and peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    output_rows = len(result) if hasattr(result, '__len__') and not hasattr(result, 'to_plotly_json') else None
+    return result, {'stage': stage, 'seconds': seconds, 'peak_bytes': peak, 'output_rows': output_rows}
+
+def run_scale(rows, customers, workdir, legacy=False, skip_figures=()):
+    """Generate one dataset and measure every stage on it."""
+    source = write_transactions_csv(os.path.join(workdir, f'transactions-{rows}.csv'), rows, customers)
+    results = []
+
+    transactions, result = measure('load', load_data, source)
+    results.append(result)
+    if legacy:
+        frame, result = measure('legacy.recency', calculate_recency, transactions.copy())
+        results.append(result)
+        frame, result = measure('legacy.frequency', calculate_frequency, frame)
+        results.append(result)
+        _, result = measure('legacy.monetary', calculate_monetary, frame)
+        results.append(result)
+    scored, result = measure('aggregate', aggregate_customers, transactions)
+    results.append(result)
+    scored, result = measure('recency', calculate_customer_recency, scored, AS_OF)
+    results.append(result)
+    scored, result = measure('scores', assign_rfm_scores, scored)
+    results.append(result)
+    scored, result = measure('value_segments', assign_rfm_value_segments, scored)
+    results.append(result)
+    scored, result = measure('customer_segments', assign_rfm_customer_segments, scored)
+    results.append(result)
+    for chart_id, builder in FIGURE_BUILDERS.items():
+        if chart_id in skip_figures:
+            continue
+        _, result = measure(f'figure.{chart_id}', builder, scored)
+        results.append(result)
+
+    os.remove(source)
+    for result in results:
+        result.update(rows=rows, customers=customers)
+    return results
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    """Print the time and memory ratio of each stage against a previous run."""
+    with open(baseline_path) as handle:
+        baseline = pd.DataFrame(json.load(handle)['results'])
+    current = pd.DataFrame(results)
+    merged = current.merge(baseline, on=['rows', 'stage'], suffixes=('', '_baseline'))
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_baseline']
+    merged['memory_ratio'] = merged['peak_bytes'] / merged['peak_bytes_baseline']
+    print(merged[['rows', 'stage', 'seconds', 'seconds_baseline', 'time_ratio', 'memory_ratio']].to_string(index=False))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='RFM pipeline scaling benchmark')
+    parser.add_argument('--rows', default='1000,100000,1000000', help='comma-separated row counts')
+    parser.add_argument('--rows-per-customer', type=float, default=20.0)
+    parser.add_argument('--legacy', action='store_true', help='also time the per-transaction recency/frequency/monetary stages')
+    parser.add_argument('--skip-figure', action='append', default=[], help='chart id to leave out (repeatable)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # A small discarded run pays one-off import and template costs up front
+        run_scale(1000, 50, workdir)
+        for rows in (int(value) for value in args.rows.split(',')):
+            customers = max(int(rows / args.rows_per_customer), 1)
+            results.extend(run_scale(rows, customers, workdir, args.legacy, args.skip_figure))
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    else:
+        print(pd.DataFrame(results)[['rows', 'stage', 'seconds', 'peak_bytes', 'output_rows']].to_string(index=False))
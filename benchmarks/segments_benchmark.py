@@ -0,0 +1,44 @@
+"""Compare the mask-based customer segment assignment with the rule-table lookup.
+
+Usage: python benchmarks/segments_benchmark.py [rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing import assign_rfm_customer_segments
+
+def mask_segments(data):
+    """The previous implementation: five boolean masks over an object column."""
+    data['RFM Customer Segments'] = ''
+    data.loc[data['RFM Score'] >= 10, 'RFM Customer Segments'] = 'Champions'
+    data.loc[(data['RFM Score'] >= 6) & (data['RFM Score'] < 10), 'RFM Customer Segments'] = 'Potential Loyalists'
+    data.loc[(data['RFM Score'] >= 5) & (data['RFM Score'] < 6), 'RFM Customer Segments'] = 'At Risk Customers'
+    data.loc[(data['RFM Score'] >= 4) & (data['RFM Score'] < 5), 'RFM Customer Segments'] = 'Cannot Lose'
+    data.loc[data['RFM Score'] < 4, 'RFM Customer Segments'] = 'Lost'
+    return data
+
+def measure(label, func, scores):
+    """Time func on a fresh frame and report peak traced memory and column size per row."""
+    data = pd.DataFrame({'RFM Score': scores})
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_row = data['RFM Customer Segments'].memory_usage(index=False, deep=True) / len(data)
+    print(f"{label:<12} {elapsed:>8.3f} s {peak / 2**20:>10.1f} MiB peak {per_row:>8.2f} bytes/row")
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    scores = np.random.default_rng(0).integers(3, 16, rows)
+    print(f"{rows:,} rows")
+    measure('masks', mask_segments, scores)
+    measure('rule table', assign_rfm_customer_segments, scores)
@@ -0,0 +1,54 @@
+"""Synthetic transaction data with the rfm_data.csv schema.
+
+Usage: python benchmarks/synthetic.py output.csv [rows] [customers]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+PRODUCTS = ['Product A', 'Product B', 'Product C', 'Product D']
+LOCATIONS = ['Tokyo', 'London', 'New York', 'Paris']
+COLUMNS = ['CustomerID', 'PurchaseDate', 'TransactionAmount', 'ProductInformation', 'OrderID', 'Location']
+
+def customer_weights(customers, activity_shape=4.0, seed=0):
+    """Draw a purchase propensity per customer; a smaller shape gives a more skewed spread."""
+    weights = np.random.default_rng(seed).gamma(activity_shape, size=customers)
+    return weights / weights.sum()
+
+def generate_transactions(rows, customers, seed=0, activity_shape=4.0, start='2023-01-01', days=365,
+                          first_order_id=100000, weights=None):
+    """Build ``rows`` transactions spread over ``customers`` with skewed purchase counts.
+
+    Customers buy in proportion to a gamma-distributed propensity, amounts are
+    log-normal, and each row gets a unique OrderID starting at ``first_order_id``.
+    """
+    rng = np.random.default_rng(seed + 1)
+    if weights is None:
+        weights = customer_weights(customers, activity_shape, seed)
+    return pd.DataFrame({
+        'CustomerID': 1000 + rng.choice(customers, rows, p=weights),
+        'PurchaseDate': pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit='D'),
+        'TransactionAmount': rng.lognormal(5, 0.5, rows).round(2),
+        'ProductInformation': rng.choice(PRODUCTS, rows),
+        'OrderID': np.arange(first_order_id, first_order_id + rows),
+        'Location': rng.choice(LOCATIONS, rows),
+    }, columns=COLUMNS)
+
+def write_transactions_csv(path, rows, customers, seed=0, activity_shape=4.0, chunk_rows=1_000_000):
+    """Write a synthetic CSV in chunks so that files larger than memory can be produced."""
+    weights = customer_weights(customers, activity_shape, seed)
+    written = 0
+    while written < rows:
+        size = min(chunk_rows, rows - written)
+        chunk = generate_transactions(size, customers, seed + written, first_order_id=100000 + written, weights=weights)
+        chunk['PurchaseDate'] = chunk['PurchaseDate'].dt.strftime('%Y-%m-%d')
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += size
+    return path
+
+if __name__ == '__main__':
+    output = sys.argv[1]
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    n_customers = int(sys.argv[3]) if len(sys.argv) > 3 else max(rows // 20, 1)
+    write_transactions_csv(output, rows, n_customers)
@@ -0,0 +1,84 @@
+"""Startup time and private memory of N web workers loading the dashboard dataset.
+
+"private" has every worker parse, score and join the data itself, as the app
+did before the shared cache. "shared" has the workers go through the on-disk
+cache: the first one builds the tables, the rest wait on its lock and attach
+the memory-mapped copy. Memory is the anonymous (unshared) RSS of each worker.
+
+Usage: python benchmarks/workers_benchmark.py [rows] [workers,workers,...]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_transactions_csv
+
+def anon_rss_bytes():
+    """Resident memory not backed by a file, i.e. this process's private copy of its data."""
+    with open('/proc/self/status') as handle:
+        for line in handle:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+def load_private(source, cache_dir):
+    from data_processing import load_data, process_data
+    from grid import grid_frame
+
+    transactions = load_data(source, compact=True)
+    customers = process_data(transactions)
+    return grid_frame(transactions, customers)
+
+def load_shared(source, cache_dir):
+    from cache import cached_frame, dataset_key, load_scored_data
+    from grid import grid_frame
+
+    transactions, customers = load_scored_data(source, cache_dir)
+    return cached_frame(dataset_key(source), 'grid', lambda: grid_frame(transactions, customers), cache_dir)
+
+def worker(mode, source, cache_dir, ready, started, results, done):
+    import app  # noqa: F401  (imports are paid before the clock starts)
+
+    baseline = anon_rss_bytes()
+    ready.put(True)
+    started.wait()
+    start = time.perf_counter()
+    data = (load_shared if mode == 'shared' else load_private)(source, cache_dir)
+    results.put((time.perf_counter() - start, anon_rss_bytes() - baseline, len(data)))
+    done.wait()
+
+def run(mode, workers, source, cache_dir):
+    """Start ``workers`` processes at once; return the slowest load time and the summed private memory."""
+    context = multiprocessing.get_context('spawn')
+    started, done, ready, results = context.Event(), context.Event(), context.Queue(), context.Queue()
+    processes = [context.Process(target=worker, args=(mode, source, cache_dir, ready, started, results, done)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    started.set()
+    measured = [results.get() for _ in processes]
+    done.set()
+    for process in processes:
+        process.join()
+    return max(seconds for seconds, _, _ in measured), sum(memory for _, memory, _ in measured)
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    worker_counts = [int(value) for value in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4]
+    with tempfile.TemporaryDirectory() as workdir:
+        source = write_transactions_csv(os.path.join(workdir, 'transactions.csv'), rows, max(rows // 20, 1))
+        # Workers import app, which loads RFM_DATA_SOURCE on import; point it at a tiny file
+        os.environ['RFM_DATA_SOURCE'] = write_transactions_csv(os.path.join(workdir, 'tiny.csv'), 100, 10)
+        os.environ['RFM_CACHE_DIR'] = os.path.join(workdir, 'app-cache')
+        print(f"{rows:,} transactions")
+        for workers in worker_counts:
+            for mode in ('private', 'shared'):
+                cache_dir = os.path.join(workdir, f'cache-{mode}-{workers}')
+                seconds, memory = run(mode, workers, source, cache_dir)
+                print(f"{mode:<8} {workers:>2} workers   ready in {seconds:>7.2f} s   private memory {memory / 2**20:>8.1f} MiB")
@@ -0,0 +1,173 @@
+"""Bin edges for RFM scoring: equal-width or approximate quantiles, both mergeable.
+
+A binner is fed values with ``update`` (any number of times, e.g. once per
+chunk or partition), combined with others with ``merge``, and turned into bin
+edges with ``edges``. Edges can be saved and loaded again so that later runs
+score against the same frozen bins.
+"""
+import json
+
+import numpy as np
+
+# Fixed so that unfrozen quantile edges are the same on every run over the same input
+DEFAULT_SEED = 0
+
+class KLLSketch:
+    """Mergeable approximate quantile sketch (Karnin, Lang and Liberty) over floats.
+
+    Keeps ``O(k log(n / k))`` values in levels of compactors, where a value at
+    level ``h`` stands for ``2**h`` inputs. The rank of a returned quantile is
+    within about ``1.7 / k`` of ``n`` of the requested one with high
+    probability (``k=200``: about 1%), however many values went in. The exact
+    minimum and maximum are tracked alongside. Which values are promoted is
+    random; pass ``seed=None`` for fresh randomness on each run.
+    """
+
+    def __init__(self, k=200, seed=DEFAULT_SEED):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                # Promote every other value, starting at a random offset, so ranks stay unbiased
+                promoted = items[odd + self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add an array of values; NaNs are ignored."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one; the result summarizes both inputs."""
+        self.levels.extend(np.empty(0) for _ in range(len(other.levels) - len(self.levels)))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate quantiles for an array of probabilities in [0, 1]."""
+        if not self.n:
+            raise ValueError("Cannot take quantiles of an empty sketch")
+        qs = np.asarray(qs, dtype=float)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = values[np.minimum(positions, len(values) - 1)]
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+    def retained(self):
+        """Number of values held, which bounds the sketch's memory."""
+        return sum(len(items) for items in self.levels)
+
+class EqualWidthBinner:
+    """``pd.cut(bins=bins)`` edges, which only depend on the running minimum and maximum."""
+
+    def __init__(self, bins=5):
+        self.bins = bins
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            self.min = min(self.min, np.nanmin(values))
+            self.max = max(self.max, np.nanmax(values))
+        return self
+
+    def merge(self, other):
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def edges(self):
+        # The same arithmetic pd.cut uses for integer bins, without building a Series per call
+        low, high = float(self.min), float(self.max)
+        if low == high:
+            low -= 0.001 * abs(low) if low != 0 else 0.001
+            high += 0.001 * abs(high) if high != 0 else 0.001
+            return np.linspace(low, high, self.bins + 1)
+        edges = np.linspace(low, high, self.bins + 1)
+        edges[0] -= (high - low) * 0.001
+        return edges
+
+class QuantileBinner:
+    """Equal-frequency edges read from a ``KLLSketch``; robust to outliers on skewed data.
+
+    Edges may repeat when many values tie (e.g. small integer frequencies); the
+    bins between repeated edges are then empty.
+    """
+
+    def __init__(self, bins=5, k=200, seed=DEFAULT_SEED):
+        self.bins = bins
+        self.sketch = KLLSketch(k, seed)
+
+    def update(self, values):
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        return self
+
+    def edges(self):
+        return self.sketch.quantiles(np.linspace(0, 1, self.bins + 1))
+
+BINNING_METHODS = {
+    'equal_width': EqualWidthBinner,
+    'quantile': QuantileBinner,
+}
+
+def make_binner(method='equal_width', **options):
+    """Create a binner by method name."""
+    try:
+        return BINNING_METHODS[method](**options)
+    except KeyError:
+        raise ValueError(f"Unknown binning method {method!r}; expected one of {sorted(BINNING_METHODS)}") from None
+
+def save_edges(edges, path):
+    """Freeze a ``{column: edges}`` mapping to a JSON file."""
+    with open(path, 'w') as handle:
+        json.dump({column: [float(edge) for edge in values] for column, values in edges.items()}, handle, indent=2)
+
+def load_edges(path):
+    """Load edges written by ``save_edges``."""
+    with open(path) as handle:
+        return {column: np.array(values) for column, values in json.load(handle).items()}
@@ -0,0 +1,250 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks on Windows; concurrent cold starts then duplicate work
+    fcntl = None
+
+import metrics
+from clustering import DEFAULT_CLUSTERS, ClusterModel
+from data_processing import DATA_URL, load_data, process_data
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('RFM_CACHE_DIR', '.rfm_cache')
+
+def _require_pyarrow():
+    """Import pyarrow.feather, which the columnar cache is built on."""
+    try:
+        import pyarrow.feather as feather
+    except ImportError as exc:
+        raise ImportError("The data cache requires pyarrow: pip install pyarrow") from exc
+    return feather
+
+def source_fingerprint(source, hash_content=False):
+    """Describe a data source so that any change to it changes the cache key.
+
+    Local files are identified by absolute path, size and mtime, plus a SHA-256
+    of the contents when ``hash_content`` is set. URLs are identified by the URL.
+    """
+    if not os.path.exists(source):
+        return {'source': source}
+    stat = os.stat(source)
+    fingerprint = {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if hash_content:
+        digest = hashlib.sha256()
+        with open(source, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def scoring_params(generation=None):
+    """Parameters that change the scored output; Recency is relative to today.
+
+    ``generation`` forces a fresh entry for the same source and date, for
+    scheduled rebuilds of sources whose changes the fingerprint cannot see.
+    """
+    params = {'as_of': pd.Timestamp.now().strftime('%Y-%m-%d')}
+    if generation is not None:
+        params['generation'] = generation
+    return params
+
+def cache_key(fingerprint, params):
+    """Hash a source fingerprint and scoring parameters into a cache key."""
+    payload = json.dumps({'fingerprint': fingerprint, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def dataset_key(source=DATA_URL, hash_content=False, generation=None):
+    """Cache key of the scored dataset for ``source`` as of today."""
+    return cache_key(source_fingerprint(source, hash_content), scoring_params(generation))
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on ``path`` across processes."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+@contextlib.contextmanager
+def atomic_path(path, suffix='.tmp'):
+    """Yield a temporary path beside ``path`` and move it over ``path`` once the block succeeds.
+
+    Readers see either the old file or the complete new one; the temporary file
+    is removed if the write fails.
+    """
+    tmp_path = f'{path}.{os.getpid()}{suffix}'
+    try:
+        yield tmp_path
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+def _column_to_pandas(column):
+    """Convert one Arrow column, viewing the mapped buffers instead of copying where the type allows."""
+    import pyarrow as pa
+
+    if column.num_chunks == 1 and column.null_count == 0:
+        chunk = column.chunk(0)
+        kind = chunk.type
+        if pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_timestamp(kind):
+            return chunk.to_numpy(zero_copy_only=True)
+        if pa.types.is_dictionary(kind):
+            codes = chunk.indices.to_numpy(zero_copy_only=True)
+            return pd.Categorical.from_codes(codes, categories=chunk.dictionary.to_pandas(), ordered=kind.ordered, validate=False)
+    return column.to_pandas()
+
+def read_cached(key, name, cache_dir=DEFAULT_CACHE_DIR):
+    """Memory-map a cached table, or return None if it is not cached.
+
+    Numeric, datetime and categorical columns are read-only views of the mapped
+    file, so processes attaching the same table share its pages instead of
+    each holding a private copy.
+    """
+    path = os.path.join(cache_dir, key, f'{name}.arrow')
+    if not os.path.exists(path):
+        return None
+    feather = _require_pyarrow()
+    table = feather.read_table(path, memory_map=True)
+    columns = {column: _column_to_pandas(table.column(column)) for column in table.column_names}
+    return pd.DataFrame(columns, copy=False)
+
+def write_cached(frame, key, name, cache_dir=DEFAULT_CACHE_DIR, meta=None):
+    """Persist a table as uncompressed Arrow IPC so it can be memory-mapped.
+
+    The table is written as a single record batch so every column is one
+    contiguous buffer that ``read_cached`` can view without copying.
+    """
+    feather = _require_pyarrow()
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(entry, exist_ok=True)
+    with atomic_path(os.path.join(entry, f'{name}.arrow')) as tmp_path:
+        feather.write_feather(frame, tmp_path, compression='uncompressed', chunksize=max(len(frame), 1))
+    if meta is not None:
+        with open(os.path.join(entry, 'meta.json'), 'w') as handle:
+            json.dump({**meta, 'created': time.time()}, handle)
+
+def evict_stale(cache_dir=DEFAULT_CACHE_DIR, keep=(), source=None, max_age_seconds=None):
+    """Remove cache entries other than ``keep``.
+
+    Only entries for ``source`` are removed when it is given, and only entries
+    older than ``max_age_seconds`` when that is given. Returns the evicted keys.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    evicted = []
+    for key in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, key)
+        if key in keep or not os.path.isdir(entry):
+            continue
+        try:
+            with open(os.path.join(entry, 'meta.json')) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            meta = {}
+        if source is not None and meta.get('source') not in (None, source):
+            continue
+        if max_age_seconds is not None and time.time() - meta.get('created', 0) < max_age_seconds:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        with contextlib.suppress(OSError):
+            os.remove(f'{entry}.lock')
+        evicted.append(key)
+    return evicted
+
+def load_scored_data(source=DATA_URL, cache_dir=DEFAULT_CACHE_DIR, hash_content=False):
+    """Return ``(transactions, customers)``, served from the cache when it is warm."""
+    _, transactions, customers = load_scored_entry(source, cache_dir, hash_content)
+    return transactions, customers
+
+def load_scored_entry(source=DATA_URL, cache_dir=DEFAULT_CACHE_DIR, hash_content=False, generation=None):
+    """Return ``(key, transactions, customers)``, served from the cache when it is warm.
+
+    A cold load parses and scores the source, stores both tables and evicts
+    older entries for the same source. Concurrent cold loads (one per web
+    worker, say) are serialized on a lock file, so the source is scored once
+    and the other processes attach to the result.
+    """
+    start = time.perf_counter()
+    fingerprint = source_fingerprint(source, hash_content)
+    key = cache_key(fingerprint, scoring_params(generation))
+    transactions = read_cached(key, 'transactions', cache_dir)
+    customers = read_cached(key, 'customers', cache_dir)
+    if transactions is not None and customers is not None:
+        metrics.inc('rfm_cache_requests_total', cache='dataset', result='hit')
+        logger.info("Warm start from cache %s in %.3f s", key, time.perf_counter() - start)
+        return key, transactions, customers
+
+    with file_lock(os.path.join(cache_dir, f'{key}.lock')):
+        transactions = read_cached(key, 'transactions', cache_dir)
+        customers = read_cached(key, 'customers', cache_dir)
+        if transactions is not None and customers is not None:
+            metrics.inc('rfm_cache_requests_total', cache='dataset', result='hit')
+            logger.info("Attached to cache %s built by another process in %.3f s", key, time.perf_counter() - start)
+            return key, transactions, customers
+
+        metrics.inc('rfm_cache_requests_total', cache='dataset', result='miss')
+        transactions = load_data(source, compact=True)
+        customers = process_data(transactions)
+        meta = {'source': fingerprint['source']}
+        write_cached(transactions, key, 'transactions', cache_dir)
+        write_cached(customers, key, 'customers', cache_dir, meta=meta)
+        evict_stale(cache_dir, keep=(key,), source=fingerprint['source'])
+    logger.info("Cold start for %s in %.3f s", source, time.perf_counter() - start)
+    # Reattach so this process shares the mapped pages like every other one
+    return key, read_cached(key, 'transactions', cache_dir), read_cached(key, 'customers', cache_dir)
+
+def cached_frame(key, name, build, cache_dir=DEFAULT_CACHE_DIR):
+    """Return a table derived from a cached dataset, building and storing it once across processes."""
+    frame = read_cached(key, name, cache_dir)
+    if frame is not None:
+        return frame
+    with file_lock(os.path.join(cache_dir, key, f'{name}.lock')):
+        frame = read_cached(key, name, cache_dir)
+        if frame is None:
+            write_cached(build(), key, name, cache_dir)
+            frame = read_cached(key, name, cache_dir)
+    return frame
+
+def cached_cluster_model(customers, source=DATA_URL, cache_dir=DEFAULT_CACHE_DIR, k=DEFAULT_CLUSTERS):
+    """Load the persisted KMeans model with ``k`` clusters, fitting it on ``customers`` when needed.
+
+    The model lives beside the dataset entries rather than in one, so it
+    outlives refreshes: later datasets from the same source (path or URL) are
+    assigned to the same centroids even as the file grows. Each source gets
+    its own file, named by a hash of the source, so switching sources back and
+    forth reuses both models instead of refitting. Delete the file to force a
+    refit.
+    """
+    identity = source_fingerprint(source)['source']
+    source_hash = hashlib.sha256(identity.encode()).hexdigest()[:12]
+    path = os.path.join(cache_dir, f'clusters-{source_hash}-k{k}.npz')
+    if os.path.exists(path):
+        model = ClusterModel.load(path)
+        if model.source == identity:
+            return model
+    os.makedirs(cache_dir, exist_ok=True)
+    with file_lock(f'{path}.lock'):
+        model = ClusterModel.load(path) if os.path.exists(path) else None
+        if model is None or model.source != identity:
+            if model is not None:
+                logger.info("Refitting the cluster model: it was fitted on %s, not %s", model.source, identity)
+            model = ClusterModel.fit(customers, k, source=identity)
+            model.save(path)
+        return model
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+RFM_FEATURES = ['Recency', 'Frequency', 'Monetary Value']
+ELBOW_K_RANGE = range(1, 10)
+
+_elbow_cache = {}
+
+def weighted_features(data, sample_size=None, random_state=42):
+    """Collapse the RFM feature rows to unique points with a weight per point.
+
+    Repeated rows (e.g. a customer's values copied onto each transaction) become
+    one weighted point, which leaves KMeans inertia unchanged. With
+    ``sample_size`` a uniform random subset of rows is taken first.
+    """
+    features = data[RFM_FEATURES]
+    if sample_size is not None and sample_size < len(features):
+        features = features.sample(n=sample_size, random_state=random_state)
+    points = features.value_counts(sort=False).reset_index(name='weight')
+    return points[RFM_FEATURES].to_numpy(dtype=float), points['weight'].to_numpy(dtype=float)
+
+def _scaling(points, weights):
+    """Weighted mean and standard deviation, as StandardScaler computes on the expanded rows."""
+    mean = np.average(points, axis=0, weights=weights)
+    scale = np.sqrt(np.average((points - mean) ** 2, axis=0, weights=weights))
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+def _fit_inertia(k, fit_points, fit_weights, points, weights, mini_batch, random_state):
+    """Fit one model on the fitting points and return its inertia on all points."""
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    if mini_batch:
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=4096, n_init=3)
+    else:
+        model = KMeans(n_clusters=k, random_state=random_state)
+    model.fit(fit_points, sample_weight=fit_weights)
+    return float(-model.score(points, sample_weight=weights))
+
+def data_fingerprint(points, weights, **params):
+    """Hash the feature matrix, weights and fitting parameters."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(points).tobytes())
+    digest.update(np.ascontiguousarray(weights).tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:24]
+
+def elbow_inertia(data, k_range=ELBOW_K_RANGE, sample_size=None, mini_batch=False, n_jobs=1,
+                  random_state=42, cache_dir=None):
+    """Compute the KMeans inertia curve over ``k_range`` on standardized RFM features.
+
+    Rows are deduplicated into weighted points, optionally subsampled
+    (``sample_size``) and fitted with ``MiniBatchKMeans`` (``mini_batch``). The
+    values of k are fitted in parallel with ``n_jobs`` workers. Inertia is always
+    evaluated on the full weighted data, so approximate curves stay comparable
+    with the exact one. Curves are cached in memory, and on disk under
+    ``cache_dir`` when given, keyed by a fingerprint of the data and options.
+    """
+    k_range = list(k_range)
+    points, weights = weighted_features(data)
+    mean, scale = _scaling(points, weights)
+    points = (points - mean) / scale
+    if sample_size is None:
+        fit_points, fit_weights = points, weights
+    else:
+        fit_points, fit_weights = weighted_features(data, sample_size, random_state)
+        fit_points = (fit_points - mean) / scale
+
+    key = data_fingerprint(points, weights, k_range=k_range, sample_size=sample_size,
+                           mini_batch=mini_batch, random_state=random_state)
+    if key in _elbow_cache:
+        metrics.inc('rfm_cache_requests_total', cache='elbow', result='hit')
+        return _elbow_cache[key]
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, f'elbow-{key}.json')
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path) as handle:
+            inertia = json.load(handle)
+        _elbow_cache[key] = inertia
+        metrics.inc('rfm_cache_requests_total', cache='elbow', result='hit')
+        return inertia
+
+    metrics.inc('rfm_cache_requests_total', cache='elbow', result='miss')
+    from joblib import Parallel, delayed
+
+    inertia = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_fit_inertia)(k, fit_points, fit_weights, points, weights, mini_batch, random_state)
+        for k in k_range
+    )
+    _elbow_cache[key] = inertia
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'w') as handle:
+            json.dump(inertia, handle)
+    return inertia
+
+def elbow_approximation_error(data, k_range=ELBOW_K_RANGE, **options):
+    """Compare an approximate elbow curve with the exact one.
+
+    ``options`` are passed to ``elbow_inertia`` for the approximate curve.
+    Returns a frame with both curves and the relative error per k.
+    """
+    k_range = list(k_range)
+    exact = elbow_inertia(data, k_range, n_jobs=options.get('n_jobs', 1))
+    approx = elbow_inertia(data, k_range, **options)
+    report = pd.DataFrame({'k': k_range, 'exact': exact, 'approx': approx})
+    report['relative_error'] = (report['approx'] - report['exact']) / report['exact'].where(report['exact'] != 0)
+    return report
+
+DEFAULT_CLUSTERS = 4
+CLUSTER_COLUMN = 'RFM Cluster'
+
+class ClusterModel:
+    """KMeans segmentation of customers on standardized RFM features.
+
+    The model is just the scaler (``mean``, ``scale``) and the ``centroids`` in
+    standardized space, so it can be saved, loaded and applied to new or
+    updated customers without sklearn and without refitting. Clusters are
+    numbered from the most valuable centroid (recent, frequent, high spend)
+    down, so labels keep their meaning across refits. ``source`` records which
+    data source the model was fitted on.
+    """
+
+    def __init__(self, mean, scale, centroids, source=None):
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.centroids = np.asarray(centroids, dtype=float)
+        self.source = source
+
+    @property
+    def k(self):
+        return len(self.centroids)
+
+    @classmethod
+    def fit(cls, data, k=DEFAULT_CLUSTERS, sample_size=None, mini_batch=False, random_state=42, source=None):
+        """Fit on the RFM features of ``data``, deduplicated into weighted points like ``elbow_inertia``."""
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+
+        points, weights = weighted_features(data, sample_size, random_state)
+        mean, scale = _scaling(points, weights)
+        k = min(k, len(points))
+        if mini_batch:
+            model = MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=4096, n_init=3)
+        else:
+            model = KMeans(n_clusters=k, random_state=random_state)
+        model.fit((points - mean) / scale, sample_weight=weights)
+        centroids = model.cluster_centers_
+        # Standardized value: high frequency and spend, low recency
+        value = centroids[:, 1] + centroids[:, 2] - centroids[:, 0]
+        return cls(mean, scale, centroids[np.argsort(-value, kind='stable')], source)
+
+    def assign(self, data):
+        """Label of the nearest centroid for every row of ``data``."""
+        points = (data[RFM_FEATURES].to_numpy(dtype=float) - self.mean) / self.scale
+        # |x - c|^2 up to the per-row |x|^2 term, which does not change the argmin
+        distances = (self.centroids ** 2).sum(axis=1) - 2 * points @ self.centroids.T
+        return distances.argmin(axis=1).astype(np.int8 if self.k <= 127 else np.int32)
+
+    @classmethod
+    def load(cls, path):
+        """Restore a model written by ``save``."""
+        with np.load(path) as stored:
+            source = str(stored['source']) if 'source' in stored.files else None
+            return cls(stored['mean'], stored['scale'], stored['centroids'], source or None)
+
+    def save(self, path):
+        """Persist the scaler and centroids; the file is replaced atomically."""
+        from cache import atomic_path  # cache imports this module
+
+        # np.savez appends .npz to names without it
+        with atomic_path(path, suffix='.tmp.npz') as tmp_path:
+            np.savez(tmp_path, mean=self.mean, scale=self.scale, centroids=self.centroids, source=np.array(self.source or ''))
+
+def assign_clusters(customers, model):
+    """Return ``customers`` with a cluster label column right after ``RFM Customer Segments``."""
+    customers = customers.copy(deep=False)
+    position = customers.columns.get_loc('RFM Customer Segments') + 1 if 'RFM Customer Segments' in customers else len(customers.columns)
+    customers.insert(position, CLUSTER_COLUMN, model.assign(customers))
+    return customers
@@ -1,14 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-def load_data():
-    """Load customer data from a CSV file."""
-    data = pd.read_csv(
-        'https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/refs/heads/main/rfm_data.csv',
-        parse_dates=['PurchaseDate']
-    )
-    data['PurchaseDate'] = pd.to_datetime(data['PurchaseDate'])
+import metrics
+from binning import make_binner
+from utils import customer_segment_rules, customer_segments
+
+DATA_URL = 'https://raw.githubusercontent.com/yoadeoye/RFM_Customer_Segmenter/refs/heads/main/rfm_data.csv'
+
+# Columns needed to build the per-customer RFM table
+AGGREGATE_COLUMNS = ['CustomerID', 'PurchaseDate', 'TransactionAmount', 'OrderID']
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# Text columns stored as categoricals and ID columns downcast to uint32 in compact mode
+CATEGORY_COLUMNS = ['ProductInformation', 'Location']
+ID_COLUMNS = ['CustomerID', 'OrderID']
+
+# Per-customer counts downcast to the smallest integer type holding them: signed for Recency
+# (an as-of date before a purchase gives negative days), unsigned for Frequency
+COUNT_COLUMNS = {
+    'Recency': (np.int8, np.int16, np.int32, np.int64),
+    'Frequency': (np.uint8, np.uint16, np.uint32, np.int64),
+}
+
+# Per-customer columns binned into 1-5 scores
+BINNED_COLUMNS = ['Recency', 'Frequency', 'Monetary Value']
+
+@metrics.stage('load')
+def load_data(source=DATA_URL, compact=False):
+    """Load customer data from a CSV file, optionally with compact dtypes."""
+    if not compact:
+        return pd.read_csv(source, parse_dates=['PurchaseDate'])
+    data = pd.read_csv(source, parse_dates=['PurchaseDate'], dtype={column: 'category' for column in CATEGORY_COLUMNS})
+    return compact_dtypes(data)
+
+def compact_dtypes(data, max_category_ratio=0.5):
+    """Store low-cardinality text columns as categoricals and IDs as uint32 where they fit."""
+    for column in CATEGORY_COLUMNS:
+        if column in data and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            if data[column].nunique() <= max_category_ratio * len(data):
+                data[column] = data[column].astype('category')
+    for column in ID_COLUMNS:
+        if column in data and pd.api.types.is_integer_dtype(data[column]) and len(data):
+            if data[column].min() >= 0 and data[column].max() <= np.iinfo(np.uint32).max:
+                data[column] = data[column].astype(np.uint32)
     return data
 
+def compact_counts(customers):
+    """Downcast Recency and Frequency to the smallest integer type that holds them (e.g. int16, uint8).
+
+    Picks the type from the column's minimum and maximum, which is much
+    cheaper on large tables than ``pd.to_numeric(downcast=...)``.
+    """
+    for column, dtypes in COUNT_COLUMNS.items():
+        if column in customers and pd.api.types.is_integer_dtype(customers[column]) and len(customers):
+            values = customers[column].to_numpy()
+            low, high = int(values.min()), int(values.max())
+            dtype = next(dtype for dtype in dtypes if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max)
+            if values.dtype != dtype:
+                customers[column] = values.astype(dtype)
+    return customers
+
 def calculate_recency(data):
     """Calculate Recency as days since the last purchase."""
     data['Recency'] = (pd.Timestamp.now() - data['PurchaseDate']).dt.days
@@ -28,40 +82,261 @@ def calculate_monetary(data):
     data = data.merge(monetary_data, on='CustomerID', how='left')
     return data
 
-def assign_rfm_scores(data):
-    """Assign RFM scores based on quantiles of Recency, Frequency, and Monetary values."""
-    recency_scores = [5, 4, 3, 2, 1]  # Higher score for more recent purchases
-    frequency_scores = [1, 2, 3, 4, 5]  # Higher score for more frequent purchases
-    monetary_scores = [1, 2, 3, 4, 5]  # Higher score for higher spending
-    data['RecencyScore'] = pd.cut(data['Recency'], bins=5, labels=recency_scores).astype(int)
-    data['FrequencyScore'] = pd.cut(data['Frequency'], bins=5, labels=frequency_scores).astype(int)
-    data['MonetaryScore'] = pd.cut(data['Monetary Value'], bins=5, labels=monetary_scores).astype(int)
+@metrics.stage('aggregate')
+def aggregate_customers(data):
+    """Reduce transactions to one row per customer in a single grouped pass."""
+    customers = data.groupby('CustomerID', sort=False).agg(
+        LastPurchaseDate=('PurchaseDate', 'max'),
+        Frequency=('OrderID', 'count'),
+        MonetaryValue=('TransactionAmount', 'sum'),
+    )
+    customers = customers.rename(columns={'MonetaryValue': 'Monetary Value'}).reset_index()
+    customers['Monetary Value'] = customers['Monetary Value'].round(2)
+    return customers
+
+@metrics.stage('merge_partials')
+def merge_customer_partials(partials):
+    """Combine per-customer partial aggregates (max date, count, sum) into one table.
+
+    The merge is associative, so partials can be reduced in any grouping.
+    """
+    combined = pd.concat(partials, ignore_index=True)
+    customers = combined.groupby('CustomerID', sort=False).agg(
+        {'LastPurchaseDate': 'max', 'Frequency': 'sum', 'Monetary Value': 'sum'}
+    ).reset_index()
+    customers['Monetary Value'] = customers['Monetary Value'].round(2)
+    return customers
+
+@metrics.stage('aggregate_chunked')
+def aggregate_customers_chunked(source=DATA_URL, chunksize=DEFAULT_CHUNKSIZE, max_memory_mb=None):
+    """Stream a transaction CSV in chunks and reduce it to the per-customer table.
+
+    Partials are compacted whenever they exceed ``max_memory_mb`` (or every 16
+    chunks when no ceiling is given), so peak memory follows the number of
+    distinct customers rather than the number of transactions.
+    """
+    limit = None if max_memory_mb is None else max_memory_mb * 2**20
+    pending = []
+    pending_bytes = 0
+    reader = pd.read_csv(source, usecols=AGGREGATE_COLUMNS, parse_dates=['PurchaseDate'], chunksize=chunksize)
+    for chunk in reader:
+        partial = aggregate_customers(chunk)
+        pending.append(partial)
+        pending_bytes += partial.memory_usage(index=True).sum()
+        if (limit is not None and pending_bytes > limit) or (limit is None and len(pending) >= 16):
+            pending = [merge_customer_partials(pending)]
+            pending_bytes = pending[0].memory_usage(index=True).sum()
+            if limit is not None and pending_bytes > limit:
+                raise MemoryError(
+                    f"Per-customer aggregate needs {pending_bytes / 2**20:.1f} MiB, above the {max_memory_mb} MiB ceiling"
+                )
+    if not pending:
+        return aggregate_customers(pd.read_csv(source, usecols=AGGREGATE_COLUMNS, parse_dates=['PurchaseDate']))
+    return merge_customer_partials(pending)
+
+@metrics.stage('recency')
+def calculate_customer_recency(customers, as_of=None):
+    """Calculate Recency as days between each customer's last purchase and ``as_of`` (default: now)."""
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+    customers['Recency'] = (as_of - customers['LastPurchaseDate']).dt.days
+    return customers
+
+@metrics.stage('join')
+def join_customer_metrics(data, customers):
+    """Attach per-customer RFM columns to every transaction row with a single join.
+
+    Only the customer columns are materialized per row; the transaction columns
+    are shared with ``data`` rather than copied as ``merge`` would.
+    """
+    per_row = customers.set_index('CustomerID').reindex(data['CustomerID'].to_numpy())
+    return pd.concat([data, per_row.set_axis(data.index)], axis=1)
+
+def score_binners(data, method='equal_width', **options):
+    """Feed each binned column of a per-customer table into its own binner.
+
+    Binners built on separate chunks or partitions can be combined with
+    ``merge_score_binners`` to get the edges of the whole table.
+    """
+    return {column: make_binner(method, **options).update(data[column].to_numpy()) for column in BINNED_COLUMNS}
+
+def merge_score_binners(parts):
+    """Merge a list of ``score_binners`` results column by column."""
+    merged = parts[0]
+    for part in parts[1:]:
+        for column, binner in part.items():
+            merged[column].merge(binner)
+    return merged
+
+def rfm_score_edges(data, method='equal_width', **options):
+    """Compute the bin edges used by ``assign_rfm_scores``.
+
+    ``equal_width`` reproduces ``pd.cut(bins=5)``, whose edges only depend on
+    the column minimum and maximum. ``quantile`` puts a fifth of the customers
+    in each bin, using an approximate sketch (see ``binning.QuantileBinner``).
+    """
+    return {column: binner.edges() for column, binner in score_binners(data, method, **options).items()}
+
+def _searchsorted_few(edges, values, side='left'):
+    """``np.searchsorted(edges, values, side)`` as int8, for a handful of sorted edges.
+
+    One vectorized comparison per edge is several times faster than a binary
+    search per value on large arrays. NaNs land after every edge, as with
+    ``searchsorted``.
+    """
+    values = np.asarray(values)
+    codes = np.zeros(len(values), dtype=np.int8)
+    for edge in edges:
+        codes += (values > edge) if side == 'left' else (values >= edge)
+    if values.dtype.kind == 'f':
+        codes[np.isnan(values)] = len(edges)
+    return codes
+
+def _bin_codes(values, edges):
+    """Zero-based bin of each value for right-closed bins, as ``pd.cut`` assigns them.
+
+    Values outside the outer edges fall into the first or last bin, so frozen
+    edges can score data with a wider range than the data they came from.
+    """
+    return _searchsorted_few(np.asarray(edges)[1:-1], values, side='left')
+
+@metrics.stage('scores')
+def assign_rfm_scores(data, edges=None):
+    """Assign 1-5 RFM scores by binning Recency, Frequency and Monetary Value."""
+    if edges is None:
+        edges = rfm_score_edges(data)
+    # Higher score for more recent purchases, more frequent purchases and higher spending
+    data['RecencyScore'] = 5 - _bin_codes(data['Recency'].to_numpy(), edges['Recency'])
+    data['FrequencyScore'] = 1 + _bin_codes(data['Frequency'].to_numpy(), edges['Frequency'])
+    data['MonetaryScore'] = 1 + _bin_codes(data['Monetary Value'].to_numpy(), edges['Monetary Value'])
     data['RFM Score'] = data['RecencyScore'] + data['FrequencyScore'] + data['MonetaryScore']
     return data
 
-def assign_rfm_value_segments(data):
-    """Assign value segments based on RFM Score quantiles."""
+def rfm_value_segment_edges(score_counts):
+    """Compute the ``pd.qcut(q=3)`` edges of RFM Score from a count per score value.
+
+    RFM Score only takes a handful of integer values, so the tertiles can be
+    read off the cumulative counts instead of sorting the whole column. Uses the
+    same linear interpolation as ``Series.quantile``.
+    """
+    score_counts = score_counts[score_counts > 0].sort_index()
+    values = score_counts.index.to_numpy(dtype=float)
+    cumulative = np.cumsum(score_counts.to_numpy())
+    positions = np.linspace(0, 1, 4) * (cumulative[-1] - 1)
+    lower = np.floor(positions)
+    below = values[np.searchsorted(cumulative, lower, side='right')]
+    above = values[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side='right')]
+    return below + (above - below) * (positions - lower)
+
+@metrics.stage('value_segments')
+def assign_rfm_value_segments(data, edges=None):
+    """Assign value segments based on RFM Score quantiles.
+
+    Scores up to the first tertile edge are Low-Value and scores above the
+    second are High-Value, as ``pd.qcut`` assigns them. When edges coincide
+    because scores are concentrated, the segments between them stay empty
+    instead of raising; if every score is the same, every customer is Mid-Value.
+    """
     rfm_labels = ['Low-Value', 'Mid-Value', 'High-Value']
-    data['rfmValueSegment'] = pd.qcut(data['RFM Score'], q=3, labels=rfm_labels)
+    if edges is None:
+        edges = rfm_value_segment_edges(data['RFM Score'].value_counts())
+    edges = np.asarray(edges, dtype=float)
+    if edges[0] == edges[-1]:
+        codes = np.ones(len(data), dtype=np.int8)
+    else:
+        codes = _searchsorted_few(edges[1:3], data['RFM Score'].to_numpy(), side='left')
+    data['rfmValueSegment'] = pd.Categorical.from_codes(codes, categories=rfm_labels)
     return data
 
+@metrics.stage('customer_segments')
 def assign_rfm_customer_segments(data):
-    """Assign customer segments based on RFM Score thresholds."""
-    data['RFM Customer Segments'] = ''
-    data.loc[data['RFM Score'] >= 10, 'RFM Customer Segments'] = 'Champions'
-    data.loc[(data['RFM Score'] >= 6) & (data['RFM Score'] < 10), 'RFM Customer Segments'] = 'Potential Loyalists'
-    data.loc[(data['RFM Score'] >= 5) & (data['RFM Score'] < 6), 'RFM Customer Segments'] = 'At Risk Customers'
-    data.loc[(data['RFM Score'] >= 4) & (data['RFM Score'] < 5), 'RFM Customer Segments'] = 'Cannot Lose'
-    data.loc[data['RFM Score'] < 4, 'RFM Customer Segments'] = 'Lost'
-    return data
+    """Assign customer segments based on RFM Score thresholds.
 
-def process_data():
-    """Execute the full data processing pipeline."""
-    data = load_data()
-    data = calculate_recency(data)
-    data = calculate_frequency(data)
-    data = calculate_monetary(data)
-    data = assign_rfm_scores(data)
-    data = assign_rfm_value_segments(data)
-    data = assign_rfm_customer_segments(data)
+    The thresholds come from ``utils.customer_segment_rules`` and are applied in
+    one vectorized lookup, producing a categorical column.
+    """
+    thresholds = np.array([minimum for minimum, _, _ in reversed(customer_segment_rules[:-1])])
+    codes = _searchsorted_few(thresholds, data['RFM Score'].to_numpy(), side='right')
+    np.subtract(len(customer_segments) - 1, codes, out=codes)
+    data['RFM Customer Segments'] = pd.Categorical.from_codes(codes, categories=customer_segments)
     return data
+
+def score_customers(customers, as_of=None, edges=None, binning='equal_width'):
+    """Run recency, scoring and segmentation on a per-customer table.
+
+    ``edges`` fixes the score bins (e.g. frozen from an earlier run); by default
+    they are derived from this table with the ``binning`` method.
+    """
+    customers = compact_counts(calculate_customer_recency(customers, as_of))
+    if edges is None:
+        edges = rfm_score_edges(customers, binning)
+    customers = assign_rfm_scores(customers, edges)
+    customers = assign_rfm_value_segments(customers)
+    customers = assign_rfm_customer_segments(customers)
+    return customers
+
+@metrics.stage('process_data')
+def process_data(data=None, join_transactions=False, as_of=None, edges=None, binning='equal_width'):
+    """Execute the full data processing pipeline on the per-customer table.
+
+    Returns one scored row per customer, with Recency measured at ``as_of``
+    (default: now) and scores binned on ``edges`` when given, otherwise on
+    edges computed with ``binning``. Pass ``join_transactions=True`` to get
+    the transaction-level frame with the customer metrics joined back on.
+    """
+    if data is None:
+        data = load_data()
+    customers = score_customers(aggregate_customers(data), as_of, edges, binning)
+    if join_transactions:
+        return join_customer_metrics(data, customers)
+    return customers
+
+@metrics.stage('process_data_chunked')
+def process_data_chunked(source=DATA_URL, chunksize=DEFAULT_CHUNKSIZE, max_memory_mb=None, as_of=None, edges=None,
+                         binning='equal_width'):
+    """Execute the pipeline on a CSV that does not fit in memory.
+
+    Produces the same per-customer table as ``process_data``.
+    """
+    customers = aggregate_customers_chunked(source, chunksize, max_memory_mb)
+    return score_customers(customers, as_of, edges, binning)
+
+def _aggregate_partition(partition, as_of, binning):
+    """Aggregate, compute Recency and fill score binners for one hash partition of the transactions."""
+    customers = calculate_customer_recency(aggregate_customers(partition), as_of)
+    # First row of each group as groupby sees them, so customers with a missing ID are skipped here too
+    customers['FirstRow'] = partition.groupby('CustomerID', sort=False).head(1).index.to_numpy()
+    return customers, score_binners(customers, binning)
+
+def partition_by_customer(data, partitions):
+    """Hash-partition transactions by CustomerID so each customer lands in one partition."""
+    buckets = pd.util.hash_array(data['CustomerID'].to_numpy()) % partitions
+    return [data[buckets == bucket] for bucket in range(partitions)]
+
+@metrics.stage('process_data_parallel')
+def process_data_parallel(data=None, workers=None, as_of=None, binning='equal_width', edges=None):
+    """Execute the pipeline with the per-customer aggregation spread over a process pool.
+
+    Transactions are hash-partitioned by CustomerID and aggregated in
+    ``workers`` processes (default: one per CPU). Each partition also fills
+    score binners, which are merged for the global bin edges unless ``edges``
+    is given; only the value-segment tertiles run on the merged customer table.
+    With the default equal-width binning the result matches ``process_data``.
+    """
+    if data is None:
+        data = load_data()
+    workers = workers or os.cpu_count()
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+    if workers == 1:
+        return process_data(data, as_of=as_of, edges=edges, binning=binning)
+    data = data[AGGREGATE_COLUMNS].reset_index(drop=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_aggregate_partition, partition_by_customer(data, workers), [as_of] * workers, [binning] * workers))
+    partials, binners = zip(*results)
+    if edges is None:
+        edges = {column: binner.edges() for column, binner in merge_score_binners(list(binners)).items()}
+    customers = pd.concat(partials).sort_values('FirstRow').drop(columns='FirstRow').reset_index(drop=True)
+    customers = compact_counts(customers)
+    customers = assign_rfm_scores(customers, edges)
+    customers = assign_rfm_value_segments(customers)
+    customers = assign_rfm_customer_segments(customers)
+    return customers
@@ -0,0 +1,55 @@
+import gzip
+import hashlib
+import os
+from collections import namedtuple
+
+import flask
+import plotly.io as pio
+
+from cache import atomic_path
+
+FigurePayload = namedtuple('FigurePayload', ['etag', 'body', 'gzip_body'])
+
+def serialize_figure(fig):
+    """Serialize a figure once to JSON (orjson when installed) with a gzipped copy and an ETag."""
+    body = pio.to_json(fig, validate=False, engine='auto').encode()
+    etag = hashlib.sha1(body).hexdigest()
+    return FigurePayload(etag, body, gzip.compress(body, compresslevel=6))
+
+def write_payload(payload, directory, chart_id):
+    """Store a payload on disk so other processes can serve it without rebuilding the figure."""
+    os.makedirs(directory, exist_ok=True)
+    for suffix, body in (('.json', payload.body), ('.json.gz', payload.gzip_body)):
+        with atomic_path(os.path.join(directory, chart_id + suffix)) as tmp_path, open(tmp_path, 'wb') as handle:
+            handle.write(body)
+
+def read_payload(directory, chart_id):
+    """Load a payload stored by ``write_payload``, or return None if there is none."""
+    try:
+        # The gzipped copy is written last, so its presence means both files are complete
+        with open(os.path.join(directory, f'{chart_id}.json.gz'), 'rb') as handle:
+            gzip_body = handle.read()
+        with open(os.path.join(directory, f'{chart_id}.json'), 'rb') as handle:
+            body = handle.read()
+    except FileNotFoundError:
+        return None
+    return FigurePayload(hashlib.sha1(body).hexdigest(), body, gzip_body)
+
+def figure_response(payload, request=None):
+    """Build the HTTP response for a cached payload.
+
+    Answers ``304 Not Modified`` when the client already holds the same ETag and
+    sends the gzipped body when the client accepts it.
+    """
+    request = request or flask.request
+    if payload.etag in request.if_none_match:
+        response = flask.Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = flask.Response(payload.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = flask.Response(payload.body, mimetype='application/json')
+    response.set_etag(payload.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from data_processing import join_customer_metrics
+
+GRID_BLOCK_SIZE = 100
+
+def grid_frame(transactions, customers):
+    """Join the customer metrics back onto the transactions, with dates as display strings."""
+    data = join_customer_metrics(transactions, customers)
+    data['PurchaseDate'] = data['PurchaseDate'].dt.strftime('%Y-%m-%d')
+    data['LastPurchaseDate'] = data['LastPurchaseDate'].dt.strftime('%Y-%m-%d')
+    return data
+
+def column_defs(data):
+    """Build AG Grid column definitions with a filter type matching each column."""
+    defs = []
+    for column in data.columns:
+        if pd.api.types.is_numeric_dtype(data[column]):
+            defs.append({"field": column, "filter": "agNumberColumnFilter"})
+        else:
+            defs.append({"field": column, "filter": "agTextColumnFilter"})
+    return defs
+
+def _condition_mask(values, condition):
+    """Evaluate one AG Grid filter condition against a column."""
+    kind = condition.get('type', 'contains')
+    if kind == 'blank':
+        return values.isna().to_numpy()
+    if kind == 'notBlank':
+        return values.notna().to_numpy()
+    if condition.get('filterType') == 'number':
+        target = condition.get('filter')
+        numbers = values.to_numpy()
+        if kind == 'equals':
+            return numbers == target
+        if kind == 'notEqual':
+            return numbers != target
+        if kind == 'lessThan':
+            return numbers < target
+        if kind == 'lessThanOrEqual':
+            return numbers <= target
+        if kind == 'greaterThan':
+            return numbers > target
+        if kind == 'greaterThanOrEqual':
+            return numbers >= target
+        if kind == 'inRange':
+            return (numbers >= target) & (numbers <= condition.get('filterTo'))
+        raise ValueError(f"Unsupported number filter: {kind}")
+    text = values.astype(str).str.lower()
+    target = str(condition.get('filter', '')).lower()
+    if kind == 'contains':
+        mask = text.str.contains(target, regex=False)
+    elif kind == 'notContains':
+        mask = ~text.str.contains(target, regex=False)
+    elif kind == 'equals':
+        mask = text == target
+    elif kind == 'notEqual':
+        mask = text != target
+    elif kind == 'startsWith':
+        mask = text.str.startswith(target)
+    elif kind == 'endsWith':
+        mask = text.str.endswith(target)
+    else:
+        raise ValueError(f"Unsupported text filter: {kind}")
+    return mask.fillna(False).to_numpy(dtype=bool)
+
+def filter_mask(data, filter_model):
+    """Combine an AG Grid filter model into one boolean row mask, or None if unfiltered."""
+    mask = None
+    for column, model in (filter_model or {}).items():
+        if 'conditions' in model:
+            masks = [_condition_mask(data[column], condition) for condition in model['conditions']]
+            column_mask = np.logical_or.reduce(masks) if model.get('operator') == 'OR' else np.logical_and.reduce(masks)
+        else:
+            column_mask = _condition_mask(data[column], model)
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+class GridSource:
+    """Serve blocks of a frame to an AG Grid infinite row model.
+
+    Filtering, sorting and slicing happen here in pandas; single-column sort
+    orders are computed once per column and reused by later requests, and the
+    order for the latest sort/filter combination is kept for follow-up blocks.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._sort_indexes = {}
+        self._last_order = (None, None)
+
+    def sort_index(self, column, ascending=True):
+        """Return the cached row order for a column.
+
+        Ordered like the multi-column ``sort_values`` path: categoricals by
+        category order, ties stable and missing values last in both directions.
+        """
+        key = (column, ascending)
+        if key not in self._sort_indexes:
+            values = self.data[column].reset_index(drop=True)
+            ordered = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+            self._sort_indexes[key] = ordered.index.to_numpy()
+        return self._sort_indexes[key]
+
+    def row_order(self, sort_model, filter_model):
+        """Return the row positions that match the filters, in display order."""
+        mask = filter_mask(self.data, filter_model)
+        if not sort_model:
+            order = np.arange(len(self.data))
+        elif len(sort_model) == 1:
+            order = self.sort_index(sort_model[0]['colId'], sort_model[0]['sort'] == 'asc')
+        else:
+            order = self.data.sort_values(
+                [item['colId'] for item in sort_model],
+                ascending=[item['sort'] == 'asc' for item in sort_model],
+                kind='stable',
+            ).index.to_numpy()
+            order = self.data.index.get_indexer(order)
+        if mask is not None:
+            order = order[mask[order]]
+        return order
+
+    def get_rows(self, request):
+        """Answer a ``getRowsRequest`` with a ``getRowsResponse`` payload."""
+        key = json.dumps([request.get('sortModel'), request.get('filterModel')], sort_keys=True)
+        cached_key, order = self._last_order
+        if cached_key != key:
+            order = self.row_order(request.get('sortModel'), request.get('filterModel'))
+            self._last_order = (key, order)
+        start = request.get('startRow', 0)
+        end = request.get('endRow', start + GRID_BLOCK_SIZE)
+        block = self.data.iloc[order[start:end]]
+        return {"rowData": block.to_dict("records"), "rowCount": len(order)}
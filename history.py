@@ -0,0 +1,81 @@
+"""RFM scores and segments of every customer at many as-of dates, from one pass over the transactions."""
+import numpy as np
+import pandas as pd
+
+import metrics
+from data_processing import score_customers
+
+HISTORY_COLUMNS = [
+    'CustomerID', 'AsOf', 'LastPurchaseDate', 'Recency', 'Frequency', 'Monetary Value',
+    'RecencyScore', 'FrequencyScore', 'MonetaryScore', 'RFM Score', 'rfmValueSegment', 'RFM Customer Segments',
+]
+
+def customer_snapshots(data, as_of_dates):
+    """Per-customer aggregates as of each date, using one sort and cumulative sums.
+
+    Transactions are sorted by customer and date once. Each customer's running
+    order count and spend are then read off at every as-of date with a single
+    ``searchsorted`` over (customer, date) keys, so the cost grows with
+    rows + customers x dates rather than rows x dates. Yields
+    ``(as_of, customers)`` pairs, ``customers`` shaped like the output of
+    ``aggregate_customers`` for the transactions up to and including ``as_of``.
+    """
+    as_of_dates = pd.DatetimeIndex(as_of_dates).unique().sort_values()
+    ordered = data[['CustomerID', 'PurchaseDate', 'OrderID', 'TransactionAmount']].sort_values(
+        ['CustomerID', 'PurchaseDate'], kind='stable'
+    )
+    customer_ids, starts, codes = np.unique(ordered['CustomerID'].to_numpy(), return_index=True, return_inverse=True)
+    dates = ordered['PurchaseDate'].to_numpy()
+    unique_dates, date_ranks = np.unique(dates, return_inverse=True)
+    # One sortable integer per row: customer first, then the rank of its purchase date
+    stride = len(unique_dates) + 1
+    keys = codes.astype(np.int64) * stride + date_ranks
+    orders = ordered['OrderID'].notna().groupby(codes).cumsum().to_numpy()
+    # Missing amounts count as zero, like the skip-NaN sum in aggregate_customers
+    spend = ordered['TransactionAmount'].fillna(0).groupby(codes).cumsum().to_numpy()
+
+    # For every (customer, date): how many of the customer's rows fall on or before the date
+    cutoffs = np.searchsorted(unique_dates, as_of_dates.to_numpy(dates.dtype), side='right')
+    queries = np.arange(len(customer_ids), dtype=np.int64)[:, None] * stride + cutoffs[None, :]
+    ends = np.searchsorted(keys, queries, side='left')
+    active = ends > starts[:, None]
+    last_rows = np.maximum(ends - 1, 0)
+
+    for index, as_of in enumerate(as_of_dates):
+        mask = active[:, index]
+        rows = last_rows[mask, index]
+        yield as_of, pd.DataFrame({
+            'CustomerID': customer_ids[mask],
+            'LastPurchaseDate': dates[rows],
+            'Frequency': orders[rows],
+            'Monetary Value': spend[rows].round(2),
+        })
+
+@metrics.stage('history')
+def rfm_history(data, as_of_dates, edges=None, binning='equal_width'):
+    """Score every customer at each as-of date into one long table.
+
+    Only customers with a purchase on or before a date appear for it. Bins are
+    re-derived per date, as ``process_data`` would on that day, unless frozen
+    ``edges`` are given to score every date on the same bins.
+    """
+    snapshots = []
+    for as_of, customers in customer_snapshots(data, as_of_dates):
+        if customers.empty:
+            continue
+        scored = score_customers(customers, as_of, edges, binning)
+        scored['AsOf'] = as_of
+        snapshots.append(scored[HISTORY_COLUMNS])
+    if not snapshots:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.concat(snapshots, ignore_index=True)
+
+def segment_transitions(history):
+    """Keep the rows where a customer enters a segment: the first date seen and every change after."""
+    history = history.sort_values(['CustomerID', 'AsOf'], kind='stable')
+    segments = history['RFM Customer Segments']
+    previous = segments.groupby(history['CustomerID'], observed=True).shift()
+    changed = previous.isna().to_numpy() | (segments.to_numpy() != previous.to_numpy())
+    transitions = history.loc[changed, ['CustomerID', 'AsOf', 'RFM Score', 'RFM Customer Segments']]
+    transitions.insert(2, 'PreviousSegment', previous[changed].astype(segments.dtype))
+    return transitions.reset_index(drop=True)
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+from data_processing import (
+    aggregate_customers,
+    assign_rfm_scores,
+    assign_rfm_value_segments,
+    assign_rfm_customer_segments,
+    compact_counts,
+    rfm_score_edges,
+    rfm_value_segment_edges,
+    score_customers,
+)
+
+SCORED_COLUMNS = ['RecencyScore', 'FrequencyScore', 'MonetaryScore', 'RFM Score', 'rfmValueSegment', 'RFM Customer Segments']
+
+def _replace_codes(current, positions, values):
+    """Copy of categorical ``current`` with the rows at ``positions`` set to ``values`` (same categories)."""
+    codes = current.cat.codes.to_numpy().copy()
+    codes[positions] = values.cat.codes.to_numpy()
+    return pd.Categorical.from_codes(codes, dtype=current.dtype)
+
+class RFMState:
+    """Persistable per-customer RFM table that can absorb new transactions.
+
+    ``customers`` is indexed by CustomerID and holds the aggregates
+    (LastPurchaseDate, Frequency, Monetary Value) alongside the scored columns.
+    With ``frozen_edges`` every update scores against those bins instead of
+    re-deriving them, so existing customers keep their scores between runs.
+    """
+
+    def __init__(self, customers, as_of, frozen_edges=None):
+        self.customers = customers
+        self.as_of = pd.Timestamp(as_of)
+        self.frozen_edges = frozen_edges
+        self.score_edges = frozen_edges if frozen_edges is not None else rfm_score_edges(customers)
+        self.value_edges = rfm_value_segment_edges(customers['RFM Score'].value_counts())
+        # Sorted copy of the index for ``_positions``, kept across updates
+        index = customers.index.to_numpy()
+        self._order = np.argsort(index, kind='stable')
+        self._sorted_ids = index[self._order]
+
+    @classmethod
+    def from_transactions(cls, data, as_of=None, frozen_edges=None):
+        """Build the state from a full transaction history."""
+        as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+        customers = score_customers(aggregate_customers(data), as_of, frozen_edges)
+        return cls(customers.set_index('CustomerID'), as_of, frozen_edges)
+
+    @classmethod
+    def load(cls, path):
+        """Restore a state written by ``save``."""
+        stored = pd.read_pickle(path)
+        return cls(stored['customers'], stored['as_of'], stored.get('frozen_edges'))
+
+    def save(self, path):
+        """Persist the per-customer table, its as-of date and any frozen edges."""
+        pd.to_pickle({'customers': self.customers, 'as_of': self.as_of, 'frozen_edges': self.frozen_edges}, path)
+
+    def scored(self):
+        """Return the table in the same shape as ``process_data``."""
+        return self.customers.reset_index()
+
+    def _positions(self, ids):
+        """Row positions of ``ids`` in ``customers``, -1 where absent.
+
+        Looks the IDs up in a sorted copy of the index that is kept across
+        updates, so appending customers does not force pandas to rebuild the
+        index's hash table on the next update.
+        """
+        if not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.intp)
+        slots = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[slots] == ids, self._order[slots], -1)
+
+    def _append_positions(self, ids, positions):
+        """Add newly appended customers to the sorted lookup."""
+        order = np.argsort(ids, kind='stable')
+        slots = np.searchsorted(self._sorted_ids, ids[order])
+        self._sorted_ids = np.insert(self._sorted_ids, slots, ids[order])
+        self._order = np.insert(self._order, slots, positions[order])
+
+    def update(self, new_transactions, as_of=None):
+        """Fold new transactions into the state and re-derive scores and segments.
+
+        Only customers present in ``new_transactions`` are re-aggregated. Scores
+        are recomputed for every customer only when the as-of date or one of the
+        global bin edges moved; otherwise just the affected rows are rescored.
+        ``as_of`` defaults to now, which never equals the stored date, so pass
+        the state's ``as_of`` to stay on the affected-rows path. Returns the
+        scored rows of the affected customers.
+        """
+        as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+        partial = aggregate_customers(new_transactions)
+        customers = self.customers
+        ids = partial['CustomerID'].to_numpy()
+        rows = self._positions(ids)
+        new = rows < 0
+        if new.any():
+            # Placeholder rows with the table's dtypes (copies of the first row), all overwritten below
+            blank = customers.iloc[np.zeros(new.sum(), dtype=np.intp)]
+            blank.index = pd.Index(ids[new], name=customers.index.name)
+            rows[new] = len(customers) + np.arange(new.sum())
+            customers = pd.concat([customers, blank])
+            self._append_positions(ids[new], rows[new])
+
+        # Work on column arrays by position; counts are widened so the sums cannot wrap
+        last_purchase = customers['LastPurchaseDate'].to_numpy().copy()
+        frequency = customers['Frequency'].to_numpy().astype(np.int64)
+        monetary = customers['Monetary Value'].to_numpy().copy()
+        known = ~new
+        last_purchase[rows[known]] = np.maximum(last_purchase[rows[known]], partial['LastPurchaseDate'].to_numpy()[known])
+        last_purchase[rows[new]] = partial['LastPurchaseDate'].to_numpy()[new]
+        frequency[rows] = np.where(new, 0, frequency[rows]) + partial['Frequency'].to_numpy()
+        monetary[rows] = (np.where(new, 0, monetary[rows]) + partial['Monetary Value'].to_numpy()).round(2)
+
+        as_of_value = as_of.to_datetime64()
+        if as_of != self.as_of:
+            recency = (as_of_value - last_purchase) // np.timedelta64(1, 'D')
+        else:
+            recency = customers['Recency'].to_numpy().astype(np.int64)
+            recency[rows] = (as_of_value - last_purchase[rows]) // np.timedelta64(1, 'D')
+        aggregates = pd.DataFrame({'Recency': recency, 'Frequency': frequency, 'Monetary Value': monetary}, copy=False)
+
+        score_edges = self.frozen_edges if self.frozen_edges is not None else rfm_score_edges(aggregates)
+        rescore_all = as_of != self.as_of or any(
+            not np.array_equal(score_edges[column], self.score_edges[column]) for column in score_edges
+        )
+        targets = slice(None) if rescore_all else rows
+        scored = assign_rfm_scores(aggregates.iloc[targets].reset_index(drop=True), score_edges)
+        columns = {'LastPurchaseDate': last_purchase, 'Frequency': frequency, 'Monetary Value': monetary, 'Recency': recency}
+        for column in SCORED_COLUMNS[:4]:
+            if rescore_all:
+                columns[column] = scored[column].to_numpy()
+            else:
+                columns[column] = customers[column].to_numpy().copy()
+                columns[column][rows] = scored[column].to_numpy()
+
+        rfm_score = columns['RFM Score']
+        value_edges = rfm_value_segment_edges(pd.Series(np.bincount(rfm_score.astype(np.intp))))
+        value_targets = slice(None) if rescore_all or not np.array_equal(value_edges, self.value_edges) else rows
+        values = assign_rfm_value_segments(pd.DataFrame({'RFM Score': rfm_score[value_targets]}), value_edges)
+        columns['rfmValueSegment'] = _replace_codes(customers['rfmValueSegment'], value_targets, values['rfmValueSegment'])
+        # Customer segments only depend on each row's own RFM Score
+        segments = assign_rfm_customer_segments(pd.DataFrame({'RFM Score': rfm_score[targets]}))
+        columns['RFM Customer Segments'] = _replace_codes(
+            customers['RFM Customer Segments'], targets, segments['RFM Customer Segments']
+        )
+
+        customers = customers.copy(deep=False)
+        for column, values in columns.items():
+            customers[column] = values
+        self.customers = customers = compact_counts(customers)
+        self.as_of = as_of
+        self.score_edges = score_edges
+        self.value_edges = value_edges
+        return customers.iloc[rows].reset_index()
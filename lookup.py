@@ -0,0 +1,75 @@
+"""Indexed lookup of scored customers by CustomerID."""
+import numpy as np
+import pandas as pd
+
+LOOKUP_COLUMNS = [
+    'CustomerID', 'LastPurchaseDate', 'Recency', 'Frequency', 'Monetary Value',
+    'RecencyScore', 'FrequencyScore', 'MonetaryScore', 'RFM Score', 'rfmValueSegment', 'RFM Customer Segments',
+    'RFM Cluster',
+]
+
+INT64_MIN, INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+class CustomerIndex:
+    """Sorted index over the per-customer table for single and batch lookups.
+
+    Building it is one argsort; a lookup is a binary search per ID followed by
+    a gather from column arrays, with no scan of the table.
+    """
+
+    def __init__(self, customers):
+        ids = customers['CustomerID'].to_numpy()
+        self._order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[self._order]
+        self._columns = {}
+        for column in LOOKUP_COLUMNS:
+            if column not in customers:
+                continue
+            values = customers[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                self._columns[column] = (values.cat.codes.to_numpy(), np.asarray(values.cat.categories, dtype=object))
+            else:
+                self._columns[column] = (values.to_numpy(), None)
+
+    def __len__(self):
+        return len(self._sorted_ids)
+
+    def positions(self, ids):
+        """Row positions of ``ids`` in the customer table, and a mask of the ones found."""
+        ids = np.asarray(ids)
+        if not len(self._sorted_ids):
+            return np.empty(0, dtype=np.intp), np.zeros(len(ids), dtype=bool)
+        slots = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[slots] == ids
+        return self._order[slots[found]], found
+
+    def records(self, ids):
+        """JSON-ready records for the IDs that exist, and the IDs that do not.
+
+        IDs outside the int64 range cannot match any customer and are reported
+        as missing.
+        """
+        try:
+            ids = np.asarray(ids, dtype=np.int64)
+            overflow = []
+        except OverflowError:
+            overflow = [value for value in ids if not INT64_MIN <= value <= INT64_MAX]
+            ids = np.asarray([value for value in ids if INT64_MIN <= value <= INT64_MAX], dtype=np.int64)
+        rows, found = self.positions(ids)
+        columns = {}
+        for column, (values, categories) in self._columns.items():
+            picked = values[rows]
+            if categories is not None:
+                columns[column] = [categories[code] if code >= 0 else None for code in picked]
+            elif picked.dtype.kind == 'M':
+                columns[column] = np.datetime_as_string(picked, unit='D').tolist()
+            else:
+                columns[column] = picked.tolist()
+        names = list(columns)
+        records = [dict(zip(names, row)) for row in zip(*columns.values())]
+        return records, ids[~found].tolist() + overflow
+
+    def get(self, customer_id):
+        """The record of one customer, or None if there is no such customer."""
+        records, _ = self.records([customer_id])
+        return records[0] if records else None
@@ -0,0 +1,84 @@
+"""Per-stage memory report for the RFM pipeline.
+
+Usage: python memory_report.py [source] [--no-compact]
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from data_processing import (
+    DATA_URL,
+    aggregate_customers,
+    assign_rfm_customer_segments,
+    assign_rfm_scores,
+    assign_rfm_value_segments,
+    calculate_customer_recency,
+    compact_counts,
+    join_customer_metrics,
+    load_data,
+)
+from metrics import rss_bytes
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where ``resource`` is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def column_bytes(frame):
+    """Deep memory usage per column, in bytes."""
+    return frame.memory_usage(index=False, deep=True)
+
+def pipeline_memory_report(source=DATA_URL, compact=True, as_of=None):
+    """Run the pipeline stage by stage and record the memory held after each one.
+
+    Returns ``(data, stages, columns)``: the joined transaction-level frame, one
+    row per stage (rows, frame bytes, RSS, peak RSS) and one row per stage and
+    column with its size in bytes.
+    """
+    stages = []
+    columns = []
+
+    def record(stage, frame):
+        sizes = column_bytes(frame)
+        stages.append({
+            'stage': stage,
+            'rows': len(frame),
+            'frame_bytes': int(sizes.sum()),
+            'rss_bytes': rss_bytes(),
+            'peak_rss_bytes': peak_rss_bytes(),
+        })
+        columns.extend({'stage': stage, 'column': column, 'bytes': int(size)} for column, size in sizes.items())
+
+    transactions = load_data(source, compact=compact)
+    record('load', transactions)
+    customers = aggregate_customers(transactions)
+    record('aggregate', customers)
+    customers = calculate_customer_recency(customers, as_of)
+    if compact:
+        customers = compact_counts(customers)
+    record('recency', customers)
+    customers = assign_rfm_scores(customers)
+    record('scores', customers)
+    customers = assign_rfm_value_segments(customers)
+    record('value segments', customers)
+    customers = assign_rfm_customer_segments(customers)
+    record('customer segments', customers)
+    data = join_customer_metrics(transactions, customers)
+    record('join', data)
+    return data, pd.DataFrame(stages), pd.DataFrame(columns)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', nargs='?', default=DATA_URL)
+    parser.add_argument('--no-compact', dest='compact', action='store_false', help='keep the dtypes read_csv infers')
+    args = parser.parse_args()
+    _, stages, columns = pipeline_memory_report(args.source, args.compact)
+    with pd.option_context('display.width', 120, 'display.max_rows', None):
+        print(stages.to_string(index=False))
+        print()
+        print(columns.pivot(index='column', columns='stage', values='bytes').reindex(columns=stages['stage']).to_string())
@@ -0,0 +1,178 @@
+"""Lightweight in-process metrics with Prometheus text output.
+
+Recording is off unless ``RFM_METRICS=1`` is set or ``enable()`` is called, in
+which case every helper returns after a single flag check.
+"""
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.environ.get('RFM_METRICS') == '1'
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_histograms = {}
+
+def enable():
+    """Start recording metrics."""
+    global _enabled
+    _enabled = True
+
+def disable():
+    """Stop recording metrics; helpers become no-ops."""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    """Return whether metrics are being recorded."""
+    return _enabled
+
+def reset():
+    """Drop everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as handle:
+            resident_pages = int(handle.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    """Add to a counter."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its latest value."""
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record one observation in a histogram."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram['counts'][index] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+class timer:
+    """Context manager that observes its elapsed time in a histogram."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        if _enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if _enabled:
+            observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+def timed(name, **labels):
+    """Decorator form of ``timer``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _rows(value):
+    """Row count of a frame-like value, or None."""
+    return len(value) if hasattr(value, 'columns') else None
+
+def stage(name):
+    """Decorator for pipeline stages: wall time, rows in/out and RSS delta."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            rows_in = _rows(args[0]) if args else None
+            memory_before = rss_bytes()
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            observe('rfm_stage_seconds', time.perf_counter() - start, stage=name)
+            if rows_in is not None:
+                inc('rfm_stage_rows_in_total', rows_in, stage=name)
+            rows_out = _rows(result)
+            if rows_out is not None:
+                inc('rfm_stage_rows_out_total', rows_out, stage=name)
+            if memory_before is not None:
+                set_gauge('rfm_stage_memory_delta_bytes', rss_bytes() - memory_before, stage=name)
+            return result
+        return wrapper
+    return decorator
+
+def _format_labels(labels, extra=()):
+    """Render a label set, escaping values as the exposition format requires."""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def _format_value(value):
+    return repr(float(value))
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, dict(value, counts=list(value['counts']))) for key, value in _histograms.items())
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f'# TYPE {name} counter')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), value in gauges:
+        if name not in typed:
+            lines.append(f'# TYPE {name} gauge')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", f"{bound:g}")])} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram["sum"])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,135 @@
+"""Background refresh of the dashboard dataset with an atomic swap.
+
+Everything the dashboard serves for one version of the data lives on a single
+``Dataset`` object. A refresh builds the next ``Dataset`` off to the side and
+then replaces the reference in one assignment, so a request that reads
+``refresher.current`` once sees either the old version or the new one, never
+a mix, and never waits for the rebuild.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from cache import DEFAULT_CACHE_DIR, cached_cluster_model, cached_frame, dataset_key, load_scored_entry
+from clustering import DEFAULT_CLUSTERS, assign_clusters
+from grid import GridSource, grid_frame
+from lookup import CustomerIndex
+from utils import customer_segments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS = 10.0
+
+class Dataset:
+    """One version of the scored data with everything derived from it; never mutated after construction."""
+
+    def __init__(self, version, source, cache_dir=DEFAULT_CACHE_DIR, generation=None, clusters=DEFAULT_CLUSTERS):
+        self.version = version
+        self.source = source
+        self.generation = generation
+        self.key, self.transactions, customers = load_scored_entry(source, cache_dir, generation=generation)
+        self.cluster_model = cached_cluster_model(customers, source, cache_dir, clusters)
+        self.customers = assign_clusters(customers, self.cluster_model)
+        self.data = cached_frame(self.key, f'grid-k{clusters}', lambda: grid_frame(self.transactions, self.customers), cache_dir)
+        self.grid_source = GridSource(self.data)
+        counts = self.customers['RFM Customer Segments'].value_counts().reindex(customer_segments, fill_value=0)
+        self.segment_counts = counts.to_dict()
+        self.customer_index = CustomerIndex(self.customers)
+        self.figure_dir = os.path.join(cache_dir, self.key, 'figures')
+
+def prepare_dataset(source, cache_dir=DEFAULT_CACHE_DIR, generation=None, clusters=DEFAULT_CLUSTERS):
+    """Score ``source`` into the cache without keeping it; used to rebuild in a separate process."""
+    key, transactions, customers = load_scored_entry(source, cache_dir, generation=generation)
+    customers = assign_clusters(customers, cached_cluster_model(customers, source, cache_dir, clusters))
+    cached_frame(key, f'grid-k{clusters}', lambda: grid_frame(transactions, customers), cache_dir)
+    return key
+
+class DatasetRefresher:
+    """Keep ``current`` up to date with the source, rebuilding in the background.
+
+    The dataset is rebuilt when its cache key changes: when the source file is
+    modified, when the scoring date rolls over, and every ``interval`` seconds
+    if one is given (for sources such as URLs whose changes cannot be seen).
+    The source is polled every ``poll_interval`` seconds. With ``use_process``
+    the pipeline runs in a child process and this process only attaches the
+    result. Only one refresh runs at a time; a refresh requested while another
+    is running is skipped rather than queued. Customers are labelled with the
+    persisted KMeans model with ``clusters`` clusters.
+    """
+
+    def __init__(self, source, cache_dir=DEFAULT_CACHE_DIR, interval=None, poll_interval=DEFAULT_POLL_SECONDS,
+                 use_process=False, clusters=DEFAULT_CLUSTERS):
+        self.source = source
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.use_process = use_process
+        self.clusters = clusters
+        self._on_swap = []
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.current = Dataset(0, source, cache_dir, self._generation(), clusters)
+        metrics.set_gauge('rfm_dataset_version', 0)
+
+    def _generation(self):
+        """Index of the current scheduled-rebuild period, or None without an interval."""
+        return int(time.time() // self.interval) if self.interval else None
+
+    def on_swap(self, callback):
+        """Call ``callback(dataset)`` after each new dataset is swapped in."""
+        self._on_swap.append(callback)
+        return callback
+
+    def is_stale(self):
+        """Whether the source, the scoring date or the rebuild period has moved past ``current``."""
+        return dataset_key(self.source, generation=self._generation()) != self.current.key
+
+    def refresh(self, force=False):
+        """Rebuild and swap in a new dataset if stale (or ``force``); return whether a swap happened."""
+        if not self._refresh_lock.acquire(blocking=False):
+            metrics.inc('rfm_refresh_total', result='skipped')
+            return False
+        try:
+            if not force and not self.is_stale():
+                return False
+            start = time.perf_counter()
+            generation = self._generation()
+            if self.use_process:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    pool.submit(prepare_dataset, self.source, self.cache_dir, generation, self.clusters).result()
+            dataset = Dataset(self.current.version + 1, self.source, self.cache_dir, generation, self.clusters)
+            self.current = dataset
+        except Exception:
+            metrics.inc('rfm_refresh_total', result='error')
+            logger.exception("Refreshing %s failed; still serving version %d", self.source, self.current.version)
+            return False
+        finally:
+            self._refresh_lock.release()
+        seconds = time.perf_counter() - start
+        metrics.inc('rfm_refresh_total', result='swapped')
+        metrics.observe('rfm_refresh_seconds', seconds)
+        metrics.set_gauge('rfm_dataset_version', dataset.version)
+        logger.info("Swapped in dataset version %d (%s) after %.3f s", dataset.version, dataset.key, seconds)
+        for callback in self._on_swap:
+            callback(dataset)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def start(self):
+        """Start polling in a daemon thread; does nothing if it is already running."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='rfm-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop polling; a refresh already under way still finishes."""
+        self._stop.set()
@@ -0,0 +1,150 @@
+"""Offline report: every dashboard chart rendered to standalone HTML (and PNG) plus one combined page.
+
+Usage:
+    python report.py --output report/
+    python report.py transactions.csv --output report/ --workers 8 --formats html,png
+    python report.py transactions.csv --output report/ --force
+
+Charts are rendered in a process pool; each worker attaches the scored data
+from the shared cache (cache.py) rather than receiving a pickled copy. The
+fingerprint of the dataset each chart was rendered from is kept in
+``manifest.json``, so a rerun on unchanged data renders nothing and only
+charts that are missing or out of date are redone. Plotly is only imported
+by the workers, so that check stays cheap. PNG output is opt-in
+(``--formats html,png``) and requires kaleido.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import DEFAULT_CACHE_DIR, atomic_path, dataset_key, load_scored_entry
+from data_processing import DATA_URL
+from utils import chart_info
+
+FORMATS = ('html', 'png')
+DEFAULT_FORMATS = ('html',)
+MANIFEST = 'manifest.json'
+REPORT = 'report.html'
+
+def _require_kaleido():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("Rendering PNG images requires kaleido: pip install kaleido") from exc
+
+def load_manifest(output):
+    """Charts already rendered into ``output``: ``{chart_id: {'key': ..., 'formats': [...]}}``."""
+    try:
+        with open(os.path.join(output, MANIFEST)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, text):
+    with atomic_path(path) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+
+def chart_files(output, chart_id, formats):
+    """Files a chart is rendered to; the HTML fragment is what the combined report embeds."""
+    files = [os.path.join(output, f'{chart_id}.fragment.html')]
+    files.extend(os.path.join(output, f'{chart_id}.{fmt}') for fmt in formats)
+    return files
+
+def is_current(entry, key, output, chart_id, formats):
+    """Whether a manifest entry covers ``key`` and ``formats`` and its files still exist."""
+    return (
+        entry is not None and entry.get('key') == key and set(formats) <= set(entry.get('formats', ()))
+        and all(os.path.exists(path) for path in chart_files(output, chart_id, formats))
+    )
+
+def render_chart(chart_id, source, cache_dir, output, formats):
+    """Build one chart from the cached dataset and write its files; runs in a worker process."""
+    from visualizations import build_figure
+
+    start = time.perf_counter()
+    _, _, customers = load_scored_entry(source, cache_dir)
+    fig = build_figure(chart_id, customers)
+    _write_atomic(os.path.join(output, f'{chart_id}.fragment.html'), fig.to_html(full_html=False, include_plotlyjs=False))
+    if 'html' in formats:
+        # Plotly.js is written once next to the charts instead of inlined into each file
+        fig.write_html(os.path.join(output, f'{chart_id}.html'), include_plotlyjs='directory')
+    if 'png' in formats:
+        fig.write_image(os.path.join(output, f'{chart_id}.png'), width=1200, height=700)
+    return chart_id, time.perf_counter() - start
+
+def assemble_report(output, key):
+    """Combine the chart fragments into one self-contained page, in dashboard order."""
+    from plotly.offline import get_plotlyjs
+
+    sections = []
+    for chart_id, info in chart_info.items():
+        with open(os.path.join(output, f'{chart_id}.fragment.html'), encoding='utf-8') as handle:
+            fragment = handle.read()
+        sections.append(f'<section><h2>{info["title"]}</h2><p>{info["description"]}</p>{fragment}</section>')
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>RFM Customer Segmentation Report</title>'
+        f'<script>{get_plotlyjs()}</script></head><body>'
+        f'<h1>RFM Customer Segmentation Report</h1><p>Dataset {key}, generated {time.strftime("%Y-%m-%d %H:%M")}</p>'
+        f'{"".join(sections)}</body></html>'
+    )
+    _write_atomic(os.path.join(output, REPORT), page)
+
+def render_report(source=DATA_URL, output='report', cache_dir=DEFAULT_CACHE_DIR, workers=None,
+                  formats=DEFAULT_FORMATS, force=False):
+    """Render every chart in ``chart_info`` that is out of date and rebuild the combined report.
+
+    Returns the ids of the charts that were rendered; an empty list means the
+    existing report was already current and nothing was written.
+    """
+    formats = tuple(formats)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown formats {sorted(unknown)}; expected some of {list(FORMATS)}")
+    if 'png' in formats:
+        _require_kaleido()
+    os.makedirs(output, exist_ok=True)
+    manifest = {} if force else load_manifest(output)
+    key = dataset_key(source)
+    stale = [chart_id for chart_id in chart_info if not is_current(manifest.get(chart_id), key, output, chart_id, formats)]
+    if not stale and os.path.exists(os.path.join(output, REPORT)):
+        return []
+
+    # Score once in this process so the workers only attach the cached tables
+    key, _, _ = load_scored_entry(source, cache_dir)
+    if stale:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(stale))) as pool:
+            futures = [pool.submit(render_chart, chart_id, source, cache_dir, output, formats) for chart_id in stale]
+            for future in futures:
+                chart_id, _ = future.result()
+                manifest[chart_id] = {'key': key, 'formats': list(formats)}
+    assemble_report(output, key)
+    _write_atomic(os.path.join(output, MANIFEST), json.dumps(manifest, indent=2))
+    return stale
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', nargs='?', default=DATA_URL, help='transaction CSV file or URL (default: the sample data)')
+    parser.add_argument('--output', default='report', help='directory to write the charts and report.html to')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='scored-data cache shared with the app')
+    parser.add_argument('--workers', type=int, help='render processes (default: one per CPU)')
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS), help='comma-separated chart formats: html, png (needs kaleido)')
+    parser.add_argument('--force', action='store_true', help='re-render every chart even if the data is unchanged')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        rendered = render_report(args.source, args.output, args.cache_dir, args.workers,
+                                 [fmt for fmt in args.formats.split(',') if fmt], args.force)
+    except (ImportError, ValueError) as exc:
+        parser.error(str(exc))
+    if rendered:
+        print(f"Rendered {len(rendered)} of {len(chart_info)} charts into {args.output} in {time.perf_counter() - start:.2f}s")
+    else:
+        print(f"{args.output} is up to date")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,14 +2,46 @@ def safe_id(segment):
     """Replace spaces with hyphens for safe HTML IDs."""
     return segment.replace(' ', '-')
 
-segment_descriptions = {
-    'Champions': "Very recent, frequent, high spenders – your best customers.",
-    'Potential Loyalists': "Buying often or recently, but not all three metrics are maxed.",
-    'At Risk Customers': "Once active, now less engaged – need attention to prevent churn.",
-    'Cannot Lose': "Valuable but slipping – perhaps spent a lot before but not lately.",
-    'Lost': "Not purchasing recently or frequently – may be disengaged."
-}
+# Customer segments as (minimum RFM Score, label, description), highest threshold first.
+# The last rule catches every remaining score.
+customer_segment_rules = [
+    (10, 'Champions', "Very recent, frequent, high spenders – your best customers."),
+    (6, 'Potential Loyalists', "Buying often or recently, but not all three metrics are maxed."),
+    (5, 'At Risk Customers', "Once active, now less engaged – need attention to prevent churn."),
+    (4, 'Cannot Lose', "Valuable but slipping – perhaps spent a lot before but not lately."),
+    (None, 'Lost', "Not purchasing recently or frequently – may be disengaged."),
+]
+
+customer_segments = [label for _, label, _ in customer_segment_rules]
+
+segment_descriptions = {label: description for _, label, description in customer_segment_rules}
+
+def segment_chart_ids(segment):
+    """Chart ids of a segment's score box plot and correlation heatmap.
+
+    The top segment's heatmap keeps the dashboard's original 'correlation_matrix' id.
+    """
+    prefix = safe_id(segment).lower().replace('-', '_')
+    heatmap_id = 'correlation_matrix' if segment == customer_segments[0] else f'{prefix}_correlation_matrix'
+    return f'{prefix}_distribution', heatmap_id
 
+def segment_chart_info(segment):
+    """Titles and descriptions of a segment's charts, keyed by chart id."""
+    distribution_id, heatmap_id = segment_chart_ids(segment)
+    return {
+        distribution_id: {
+            'title': f'Distribution of RFM Scores within {segment} Segment',
+            'short_title': f'{segment} Distribution',
+            'description': f'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the {segment} segment.'
+        },
+        heatmap_id: {
+            'title': f'Correlation Matrix of RFM Scores within {segment} Segment',
+            'short_title': f'{segment} Correlation Matrix',
+            'description': f'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the {segment} segment.'
+        },
+    }
+
+# Charts in dashboard order; each segment in customer_segment_rules gets a box plot and a heatmap
 chart_info = {
     'segment_distribution': {
         'title': 'RFM Value Segment Distribution',
@@ -26,16 +58,12 @@ chart_info = {
         'short_title': 'Bubble Chart',
         'description': 'This bubble chart displays RFM customer segments by value, with bubble size indicating the number of customers in each group.'
     },
-    'champions_distribution': {
-        'title': 'Distribution of RFM Scores within Champions Segment',
-        'short_title': 'Champions Distribution',
-        'description': 'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the Champions segment.'
-    },
-    'correlation_matrix': {
-        'title': 'Correlation Matrix of RFM Scores within Champions Segment',
-        'short_title': 'Correlation Matrix',
-        'description': 'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the Champions segment.'
-    },
+}
+
+for segment in customer_segments:
+    chart_info.update(segment_chart_info(segment))
+
+chart_info.update({
     'segment_comparison': {
         'title': 'Comparison of RFM by clusters/business needs',
         'short_title': 'Segment Comparison',
@@ -46,47 +74,7 @@ chart_info = {
         'short_title': 'Scores Comparison',
         'description': 'This grouped bar chart compares the average Recency, Frequency, and Monetary scores across all RFM segments.'
     },
-    'potential_loyalists_distribution': {
-        'title': 'Distribution of RFM Scores within Potential Loyalists Segment',
-        'short_title': 'Potential Loyalists Distribution',
-        'description': 'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the Potential Loyalists segment.'
-    },
-    'potential_loyalists_correlation_matrix': {
-        'title': 'Correlation Matrix of RFM Scores within Potential Loyalists Segment',
-        'short_title': 'Potential Loyalists Correlation Matrix',
-        'description': 'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the Potential Loyalists segment.'
-    },
-    'at_risk_customers_distribution': {
-        'title': 'Distribution of RFM Scores within At Risk Customers Segment',
-        'short_title': 'At Risk Customers Distribution',
-        'description': 'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the At Risk Customers segment.'
-    },
-    'at_risk_customers_correlation_matrix': {
-        'title': 'Correlation Matrix of RFM Scores within At Risk Customers Segment',
-        'short_title': 'At Risk Customers Correlation Matrix',
-        'description': 'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the At Risk Customers segment.'
-    },
-    'cannot_lose_distribution': {
-        'title': 'Distribution of RFM Scores within Cannot Lose Segment',
-        'short_title': 'Cannot Lose Distribution',
-        'description': 'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the Cannot Lose segment.'
-    },
-    'cannot_lose_correlation_matrix': {
-        'title': 'Correlation Matrix of RFM Scores within Cannot Lose Segment',
-        'short_title': 'Cannot Lose Correlation Matrix',
-        'description': 'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the Cannot Lose segment.'
-    },
-    'lost_distribution': {
-        'title': 'Distribution of RFM Scores within Lost Segment',
-        'short_title': 'Lost Distribution',
-        'description': 'This box plot illustrates the distribution of Recency, Frequency, and Monetary scores for customers in the Lost segment.'
-    },
-    'lost_correlation_matrix': {
-        'title': 'Correlation Matrix of RFM Scores within Lost Segment',
-        'short_title': 'Lost Correlation Matrix',
-        'description': 'This heatmap shows the correlation between Recency, Frequency, and Monetary scores within the Lost segment.'
-    },
-}
+})
 
 about_app = [
     "Elevate your e-commerce business with RFM Customer Insights, the smart app designed to turn your customer data into real growth. \n"
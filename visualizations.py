@@ -1,8 +1,15 @@
+import os
+import weakref
+from functools import partial
+
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.colors
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from cache import DEFAULT_CACHE_DIR
+from clustering import ELBOW_K_RANGE, elbow_inertia
+from utils import customer_segments, segment_chart_ids
 
 def create_segment_distribution_fig(data):
     """Create bar chart for RFM value segment distribution."""
@@ -20,22 +27,33 @@ def create_segment_distribution_fig(data):
     ).update_layout(xaxis_title='RFM Value Segment', yaxis_title='Counts', showlegend=True)
     return fig
 
-def create_elbow_fig(data):
-    """Create elbow plot for optimal KMeans clusters."""
-    rfm_df = data[['Recency', 'Frequency', 'Monetary Value']]
-    scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm_df)
-    inertia = []
-    K_range = range(1, 10)
-    for k in K_range:
-        km = KMeans(n_clusters=k, random_state=42)
-        km.fit(rfm_scaled)
-        inertia.append(km.inertia_)
+def create_elbow_fig(data, **elbow_options):
+    """Create elbow plot for optimal KMeans clusters.
+
+    ``elbow_options`` are passed to ``clustering.elbow_inertia`` to select the
+    subsampled, mini-batch or parallel modes.
+    """
+    K_range = ELBOW_K_RANGE
+    inertia = elbow_inertia(data, K_range, **elbow_options)
     fig = go.Figure().add_trace(
         go.Scatter(x=list(K_range), y=inertia, mode='lines+markers', marker=dict(size=10), line=dict(color='rgb(94,158,217)'))
     ).update_layout(title='Elbow Method for Optimal K', xaxis_title='Number of Clusters', yaxis_title='Inertia', showlegend=True, width=800, height=600)
     return fig
 
+def elbow_options_from_env(environ=os.environ):
+    """Elbow sweep options for the dashboard and report, from the ``RFM_ELBOW_*`` settings.
+
+    The defaults give the exact serial sweep; curves are cached on disk in the
+    data cache directory either way.
+    """
+    sample_size = environ.get('RFM_ELBOW_SAMPLE_SIZE')
+    return {
+        'sample_size': int(sample_size) if sample_size else None,
+        'mini_batch': environ.get('RFM_ELBOW_MINI_BATCH') == '1',
+        'n_jobs': int(environ.get('RFM_ELBOW_JOBS', 1)),
+        'cache_dir': DEFAULT_CACHE_DIR,
+    }
+
 def create_bubble_chart_fig(data):
     """Create bubble chart for RFM segments by value."""
     customer_segment_counts = data.groupby(['rfmValueSegment', 'RFM Customer Segments'],observed=True).size().reset_index(name='Count')
@@ -76,20 +94,108 @@ def create_segment_scores_fig(data):
     fig.update_layout(title='Comparison of RFM Segments based on Scores', xaxis_title='RFM Segments', yaxis_title='Score', barmode='group', showlegend=True)
     return fig
 
+SCORE_COLUMNS = ['RecencyScore', 'FrequencyScore', 'MonetaryScore']
+SCORE_NAMES = ['Recency', 'Frequency', 'Monetary']
+
+_segment_summaries = {}
+
+def _hazen_quantile(values, counts, q):
+    """Quantile of sorted distinct values with counts, interpolated the way plotly.js does."""
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    position = min(max(q * total - 0.5, 0), total - 1)
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    fraction = position % 1
+    return fraction * upper + (1 - fraction) * lower
+
+def _box_stats(values, counts):
+    """Quartiles, whiskers and outlier values for one score distribution."""
+    q1 = _hazen_quantile(values, counts, 0.25)
+    median = _hazen_quantile(values, counts, 0.5)
+    q3 = _hazen_quantile(values, counts, 0.75)
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    lowerfence = min(q1, values[inside].min())
+    upperfence = max(q3, values[inside].max())
+    outliers = values[(values < lowerfence) | (values > upperfence)]
+    return {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lowerfence, 'upperfence': upperfence, 'outliers': outliers}
+
+def _weighted_corr(points, weights):
+    """Pearson correlation of weighted points, NaN where a column is constant."""
+    mean = np.average(points, axis=0, weights=weights)
+    centered = points - mean
+    covariance = (centered * weights[:, None]).T @ centered
+    scale = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariance / np.outer(scale, scale)
+
+def summarize_segments(data):
+    """Compute box-plot statistics and correlation matrices for every segment in one grouped pass.
+
+    The scored frame is reduced to counts of each (segment, Recency, Frequency,
+    Monetary score) combination, from which each segment's quartiles, whiskers,
+    outliers and correlation matrix are derived. The result size depends on the
+    number of distinct scores, not on the number of rows.
+    """
+    joint = data.groupby(['RFM Customer Segments'] + SCORE_COLUMNS, observed=True).size().rename('count').reset_index()
+    summaries = {}
+    for segment, group in joint.groupby('RFM Customer Segments', observed=True):
+        counts = group['count'].to_numpy(dtype=float)
+        boxes = {}
+        for column in SCORE_COLUMNS:
+            marginal = group.groupby(column)['count'].sum().sort_index()
+            boxes[column] = _box_stats(marginal.index.to_numpy(dtype=float), marginal.to_numpy())
+        corr = _weighted_corr(group[SCORE_COLUMNS].to_numpy(dtype=float), counts)
+        summaries[segment] = {
+            'rows': int(counts.sum()),
+            'boxes': boxes,
+            'corr': pd.DataFrame(corr, index=SCORE_COLUMNS, columns=SCORE_COLUMNS),
+        }
+    return summaries
+
+def segment_summaries(data):
+    """Return ``summarize_segments(data)``, computed once per scored frame.
+
+    Frames are treated as read-only once scored; the entry is dropped when the
+    frame is garbage collected.
+    """
+    key = id(data)
+    if key not in _segment_summaries:
+        _segment_summaries[key] = summarize_segments(data)
+        weakref.finalize(data, _segment_summaries.pop, key, None)
+    return _segment_summaries[key]
+
 def create_segment_box_plot(data, segment_name):
-    """Create box plot for RFM scores within a specific segment."""
-    segment_data = data[data['RFM Customer Segments'] == segment_name]
+    """Create box plot for RFM scores within a specific segment from precomputed statistics."""
+    summary = segment_summaries(data).get(segment_name)
+    colors = px.colors.qualitative.Plotly
     fig = go.Figure()
-    fig.add_trace(go.Box(y=segment_data['RecencyScore'], name='Recency'))
-    fig.add_trace(go.Box(y=segment_data['FrequencyScore'], name='Frequency'))
-    fig.add_trace(go.Box(y=segment_data['MonetaryScore'], name='Monetary'))
+    for index, (column, name) in enumerate(zip(SCORE_COLUMNS, SCORE_NAMES)):
+        if summary is None:
+            fig.add_trace(go.Box(y=[], name=name))
+            continue
+        stats = summary['boxes'][column]
+        fig.add_trace(go.Box(
+            x=[name], q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']],
+            name=name, marker_color=colors[index]
+        ))
+        if len(stats['outliers']):
+            fig.add_trace(go.Scatter(
+                x=[name] * len(stats['outliers']), y=stats['outliers'], mode='markers',
+                marker=dict(color=colors[index]), showlegend=False, hoverinfo='y'
+            ))
     fig.update_layout(title=f'Distribution of RFM Score within {segment_name} Segment', yaxis_title='RFM Score', showlegend=True)
     return fig
 
 def create_segment_heatmap(data, segment_name):
     """Create heatmap of RFM score correlations within a specific segment."""
-    segment_data = data[data['RFM Customer Segments'] == segment_name]
-    correlation_matrix = segment_data[['RecencyScore', 'FrequencyScore', 'MonetaryScore']].corr()
+    summary = segment_summaries(data).get(segment_name)
+    if summary is None:
+        correlation_matrix = pd.DataFrame(np.nan, index=SCORE_COLUMNS, columns=SCORE_COLUMNS)
+    else:
+        correlation_matrix = summary['corr']
     fig = go.Figure(data=go.Heatmap(
         z=correlation_matrix.values,
         x=correlation_matrix.columns,
@@ -101,3 +207,20 @@ def create_segment_heatmap(data, segment_name):
         textfont=dict(size=16)
     )).update_layout(title=f'Correlation Matrix of RFM Scores within {segment_name} Segment')
     return fig
+
+FIGURE_BUILDERS = {
+    'segment_distribution': create_segment_distribution_fig,
+    'elbow_curve': partial(create_elbow_fig, **elbow_options_from_env()),
+    'bubble_chart': create_bubble_chart_fig,
+    'segment_comparison': create_segment_comparison_fig,
+    'segment_scores': create_segment_scores_fig,
+}
+
+for segment in customer_segments:
+    distribution_id, heatmap_id = segment_chart_ids(segment)
+    FIGURE_BUILDERS[distribution_id] = partial(create_segment_box_plot, segment_name=segment)
+    FIGURE_BUILDERS[heatmap_id] = partial(create_segment_heatmap, segment_name=segment)
+
+def build_figure(chart_id, data):
+    """Build the figure for a dashboard chart id."""
+    return FIGURE_BUILDERS[chart_id](data)